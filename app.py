@@ -7,14 +7,18 @@ from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
 from streamlit_timeline import timeline
+from utils.categories import CATEGORY_SHORT_NAMES
 # Import utility functions with fallbacks for deployment
 try:
-    from utils.intelligent_query import generate_intelligent_queries
     from utils.search_google import search_google
-    from utils.scrape_url import scrape_urls
+    from utils.scrape_url import scrape_urls, is_timeout_error
     from utils.gpt_analysis_enhanced import analyze_market_data
     from utils.professional_pdf_report import generate_professional_pdf_report
     from utils.search_options import generate_search_options, format_time_filter, get_research_depth_config
+    from utils.dedup import deduplicate_sources
+    from utils.job_runner import run_research_job, get_job_runner, ACTIVE_STATUSES, JOB_POLL_SECONDS
+    from utils.run_store import get_run_store
+    from utils.prewarm import find_fresh_run
     UTILS_AVAILABLE = True
 except ImportError:
     UTILS_AVAILABLE = False
@@ -66,6 +70,10 @@ if 'current_selected_categories' not in st.session_state:
     st.session_state.current_selected_categories = []
 if 'supply_chain_data_loaded' not in st.session_state:
     st.session_state.supply_chain_data_loaded = False
+if 'research_jobs' not in st.session_state:
+    st.session_state.research_jobs = []
+if 'loaded_research_jobs' not in st.session_state:
+    st.session_state.loaded_research_jobs = []
 
 # Custom CSS for dark theme styling
 st.markdown("""
@@ -394,6 +402,37 @@ def format_clickable_sources(source_urls):
     
     return " | ".join(formatted_sources)
 
+def display_category_previews(categories, partial_analyses, results_by_category):
+    """Display streamed category analyses while they are still generating"""
+    started = [category for category in categories if category in partial_analyses or category in results_by_category]
+    if not started:
+        return
+    
+    st.markdown("### ⚡ Live Analysis Preview")
+    tabs = st.tabs(started)
+    
+    for tab, category in zip(tabs, started):
+        with tab:
+            complete = category in results_by_category
+            analysis = results_by_category[category] if complete else partial_analyses.get(category, {})
+            
+            exec_summary = analysis.get('executive_summary', {})
+            if exec_summary.get('key_recommendation'):
+                st.markdown(f"**Key Recommendation:** {exec_summary['key_recommendation']}")
+                st.caption(f"Urgency: {exec_summary.get('urgency_level', '...')} | Confidence: {exec_summary.get('confidence_level', '...')} | Timeline: {exec_summary.get('decision_window', '...')}")
+            
+            for insight in analysis.get('insights', []):
+                if insight.get('headline'):
+                    st.markdown(f"{insight.get('emoji', '📊')} **{insight['headline']}**")
+                    if insight.get('explanation'):
+                        st.caption(insight['explanation'])
+            
+            if complete:
+                st.success("✅ Analysis complete")
+            else:
+                remaining = [section.replace('_', ' ') for section in ('market_players', 'cost_analysis', 'supply_chain', 'risk_flags', 'strategic_recommendations') if section not in analysis]
+                st.info(f"⏳ Still generating: {', '.join(remaining) if remaining else 'final sections'}")
+
 def display_category_analysis(category, intelligence_data):
     """Display analysis for a specific category"""
     st.markdown(f"### 📊 {category} Market Intelligence")
@@ -407,7 +446,11 @@ def display_category_analysis(category, intelligence_data):
         st.write(f"Category: {category}")
         st.write(f"Category-specific analysis keys: {list(analysis.keys()) if analysis else 'No analysis data'}")
         st.write(f"Total categories available: {list(category_analyses.keys()) if category_analyses else 'No category analyses'}")
-    
+        if analysis and analysis.get('analysis_mode'):
+            st.write(f"Analysis mode: {analysis['analysis_mode']}")
+        if analysis and analysis.get('source_tokens'):
+            st.write(f"Prompt tokens per source: {analysis['source_tokens']}")
+
     # Executive Summary for this category
     if 'executive_summary' in analysis:
         exec_summary = analysis['executive_summary']
@@ -929,132 +972,36 @@ def execute_research_workflow(categories, market, timescale, research_depth):
             st.session_state.current_categories = categories
             return
         
-        # Initialize intelligence_data if it's None
-        if st.session_state.intelligence_data is None:
-            st.session_state.intelligence_data = {
-                'queries': [],
-                'search_results': [],
-                'analysis': {},
-                'categories': categories,
-                'market': market,
-                'user_input': st.session_state.current_user_input
-            }
-        
         # Update current categories
         st.session_state.current_categories = categories
         
-        # Step 1: Generate intelligent queries for all categories
-        status_text = st.empty()
-        progress_bar = st.progress(0)
-        query_display = st.empty()
-        
-        status_text.text("🧠 Generating intelligent queries...")
-        progress_bar.progress(0.1)
-        
-        # Get research configuration
-        config = get_research_depth_config(research_depth)
-        time_filter = format_time_filter(timescale)
-        
-        all_queries = []
+        # The run goes through the same job code as background research, reporting progress on this thread
+        progress_bar = st.progress(0.0, text="🧠 Generating intelligent queries...")
+        preview_area = st.empty()
+        
+        def show_progress(stage, progress, partial):
+            progress_bar.progress(progress, text=f"{stage.title()}: {partial['searched']}/{len(partial['queries'])} searches | ✅ {partial['scraped']} scraped | ❌ {partial['failed']} failed")
+            with preview_area.container():
+                display_category_previews(categories, partial['previews'], partial['category_analyses'])
+        
+        intelligence_data = run_research_job({
+            'categories': categories,
+            'market': market,
+            'timescale': timescale,
+            'research_depth': research_depth,
+            'user_input': st.session_state.current_user_input
+        }, on_progress=show_progress)
+        get_run_store().save(intelligence_data)
+        st.session_state.intelligence_data = intelligence_data
         
-        # Generate enhanced queries for each category
-        for category in categories:
-            category_queries = generate_intelligent_queries(
-                category=category, 
-                market=market, 
-                time_focus=timescale, 
-                research_depth=research_depth
-            )
-            # Add category context to each query
-            for query in category_queries:
-                query['category'] = category
-            all_queries.extend(category_queries)
-        
-        # Limit total queries based on research depth
-        all_queries = all_queries[:config['num_queries']]
-        
-        # Store queries in session state
-        st.session_state.intelligence_data['queries'] = all_queries
-        
-        # Step 2: Execute searches
-        search_results = []
-        for i, query in enumerate(all_queries):
-            status_text.text(f"🔍 Executing search {i+1}/{len(all_queries)}...")
-            
-            query_display.markdown(f"""
-            <div class="query-display">
-                <strong>🔍 Current Query:</strong> {query['query']}
-                <br><small>Query {i+1} of {len(all_queries)} | Category: {query.get('category', 'General')} | Dimension: {query.get('dimension', 'Market Intelligence')}</small>
-                <br><small><em>Intelligence Value:</em> {query.get('intelligence_value', 'Market insights')}</small>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Use enhanced search with time filtering
-            search_query = query['query']
-            
-            results = search_google(
-                query=search_query, 
-                num_results=config['num_results'], 
-                time_filter=time_filter, 
-                enhanced_filtering=True
-            )
-            search_results.extend(results)
-            
-            # Update progress
-            progress_value = 0.3 + (i + 1) * 0.2 / len(all_queries)
-            progress_bar.progress(progress_value)
-        
-        # Step 3: Scrape content
-        status_text.text("📰 Extracting content from sources...")
-        query_display.markdown(f"""
-        <div class="query-display">
-            <strong>📊 Processing Results:</strong> Extracting content from {len(search_results)} sources
-            <br><small>Using {config['max_workers']} parallel workers | {timescale} filter applied</small>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        progress_bar.progress(0.5)
-        
-        # Use enhanced configuration for scraping
-        urls_to_scrape = [result['link'] for result in search_results[:config['num_results']*2]]
-        
-        scraped_content = scrape_urls(urls_to_scrape, max_workers=config['max_workers'])
-        
-        st.session_state.intelligence_data['scraped_content'] = scraped_content
-        st.session_state.intelligence_data['search_results'] = search_results
-        st.session_state.intelligence_data['config'] = config
-        
-        # Step 4: Analyze with GPT for multiple categories
-        status_text.text("🤖 Analyzing market intelligence...")
-        progress_bar.progress(0.7)
+        progress_bar.empty()
+        preview_area.empty()
         
-        if scraped_content:
-            # Generate category-specific analyses
-            from utils.category_specific_analysis import analyze_category_specific_data
-            category_analyses = {}
-            
-            for category in categories:
-                category_analysis = analyze_category_specific_data(category, market, scraped_content)
-                category_analyses[category] = category_analysis
-            
-            st.session_state.intelligence_data['category_analyses'] = category_analyses
-            
-            # For backward compatibility, also store the first category as main analysis
-            if categories:
-                st.session_state.intelligence_data['analysis'] = category_analyses[categories[0]]
-        else:
+        if not intelligence_data.get('scraped_content'):
             st.warning("No content available for analysis - check scraping results")
-            st.session_state.intelligence_data['category_analyses'] = {}
-            st.session_state.intelligence_data['analysis'] = {}
-        
-        # Step 5: Complete
-        status_text.text("✅ Intelligence generation complete!")
-        progress_bar.progress(1.0)
-        
-        # Clear progress indicators
-        progress_bar.empty()
-        status_text.empty()
-        query_display.empty()
+        timed_out = [record for record in intelligence_data.get('scrape_failures', []) if is_timeout_error(record)]
+        if timed_out:
+            st.info(f"⏱️ {len(timed_out)} slow sources were skipped after the {intelligence_data['config']['scrape_budget']}s scrape budget; continued with {len(intelligence_data['scraped_content'])} sources.")
         
     except Exception as e:
         st.error(f"Error generating intelligence: {str(e)}")
@@ -1086,24 +1033,8 @@ def display_unified_dashboard():
     
     # Create tabs based on available categories with shorter names
     if categories:
-        # Create shorter tab names for better readability
-        short_names = {
-            "Steel, Iron & Non-Ferrous Metal Construction": "Steel & Metals",
-            "Electrical Installation & Maintenance": "Electrical",
-            "Mechanical Installation & Maintenance": "Mechanical", 
-            "Built-Asset Infrastructure & Civil Engineering": "Infrastructure",
-            "Facilities Management & Maintenance": "Facilities",
-            "Construction & Building Materials": "Construction",
-            "Energy & Power Generation": "Energy",
-            "Transportation & Logistics": "Transport",
-            "Water & Wastewater Management": "Water",
-            "Telecommunications & IT Infrastructure": "IT & Telecom",
-            "Security & Safety Systems": "Security",
-            "Environmental & Waste Management": "Environment"
-        }
-        
         # Create tabs for each category with shorter names
-        short_category_names = [short_names.get(cat, cat[:15]) for cat in categories]
+        short_category_names = [CATEGORY_SHORT_NAMES.get(cat, cat[:15]) for cat in categories]
         tab_names = [f"📊 {name}" for name in short_category_names] + ["🔎 Queries", "📰 News", "📋 Sources", "📥 Export"]
         tabs = st.tabs(tab_names)
         
@@ -1132,6 +1063,9 @@ def display_unified_dashboard():
         # Display queries
         st.markdown("### 🔎 Generated Queries")
         
+        display_cache_stats(intelligence_data)
+        display_pipeline_metrics(intelligence_data)
+        
         queries = intelligence_data.get('queries', [])
         if queries:
             for i, query in enumerate(queries):
@@ -1193,6 +1127,33 @@ def display_unified_dashboard():
                 success_rate = (len(scraped_content) / len(search_results) * 100) if search_results else 0
                 st.metric("Success Rate", f"{success_rate:.1f}%")
             
+            search_index_stats = intelligence_data.get('search_index_stats')
+            if search_index_stats and search_index_stats['duplicates']:
+                st.caption(f"{search_index_stats['total_results']} search results across queries resolved to {search_index_stats['unique_urls']} unique pages ({search_index_stats['duplicates']} repeats not fetched).")
+            
+            source_facts_stats = intelligence_data.get('source_facts_stats')
+            if source_facts_stats:
+                st.caption(f"Fact sheets for {source_facts_stats['documents']} documents: {source_facts_stats['cached']} reused from cache, {source_facts_stats['extracted']} extracted, {source_facts_stats['failed']} failed.")
+            
+            refresh_report = intelligence_data.get('refresh_report')
+            refresh_baseline = intelligence_data.get('refresh_baseline')
+            if refresh_report:
+                if refresh_baseline and sorted(refresh_baseline['categories']) != sorted(intelligence_data.get('categories', [])):
+                    st.caption(f"Refreshed from an earlier {refresh_baseline['research_depth']} run covering {len(refresh_baseline['categories'])} categories.")
+                st.caption(f"Incremental refresh: {refresh_report['new_urls']} new and {refresh_report['changed_urls']} changed sources analyzed ({refresh_report['analyzed_sources']} after deduplication), {refresh_report['unchanged_urls']} unchanged sources carried over. Categories merged: {len(refresh_report['merged_categories'])}, reused: {len(refresh_report['reused_categories'])}, fully analyzed: {len(refresh_report['full_categories'])}.")
+            elif refresh_baseline and refresh_baseline.get('rebuilt'):
+                st.caption(f"Incremental refresh rebuilt the analysis from scratch rather than merging into the run from {datetime.fromtimestamp(refresh_baseline['created_at']).strftime('%d %b %H:%M')}, dropping findings carried forward from older sources.")
+            elif 'refresh_baseline' in intelligence_data:
+                st.caption(f"Incremental refresh found no earlier {intelligence_data.get('research_depth', '')} run for these categories, so this run was a full one.")
+            
+            dedup_report = intelligence_data.get('dedup_report')
+            if dedup_report and dedup_report['clusters']:
+                with st.expander(f"🔁 {dedup_report['duplicates_removed']} duplicate sources collapsed before analysis ({dedup_report['unique_sources']} unique of {dedup_report['input_sources']})", expanded=False):
+                    for cluster in dedup_report['clusters']:
+                        st.markdown(f"**{cluster['url']}** ({cluster['size']} copies)")
+                        for duplicate_url in cluster['duplicate_urls']:
+                            st.markdown(f"- {duplicate_url}")
+            
             st.divider()
             
             # Detailed Source Analysis
@@ -1200,6 +1161,7 @@ def display_unified_dashboard():
             
             # Create a map of scraped content by URL
             scraped_by_url = {item['url']: item for item in scraped_content}
+            failures_by_url = {item['url']: item for item in intelligence_data.get('scrape_failures', [])}
             
             for i, result in enumerate(search_results):
                 url = result.get('link', '')
@@ -1215,9 +1177,11 @@ def display_unified_dashboard():
                         st.markdown(f"**Title:** {result.get('title', 'N/A')}")
                         st.markdown(f"**URL:** [{url}]({url})")
                         st.markdown(f"**Snippet:** {result.get('snippet', 'N/A')}")
+                        if len(result.get('queries', [])) > 1:
+                            st.markdown(f"**Found by {len(result['queries'])} queries:** " + "; ".join(result['queries']))
                         
                         if scraped_item:
-                            content_length = len(scraped_item.get('content', ''))
+                            content_length = scraped_item.get('content_length', len(scraped_item.get('content', '')))
                             st.markdown(f"**Content Length:** {content_length:,} characters")
                             
                             # Show content preview
@@ -1231,10 +1195,17 @@ def display_unified_dashboard():
                             st.success("✅ Successfully Scraped")
                             st.markdown(f"**Domain:** {domain}")
                             st.markdown(f"**Status:** Active Source")
+                        elif url in failures_by_url and is_timeout_error(failures_by_url[url]):
+                            st.warning("⏱️ Timed Out")
+                            st.markdown(f"**Domain:** {domain}")
+                            st.markdown(f"**Status:** Slow Source")
+                            st.markdown(f"**Error:** {failures_by_url[url]['error']}")
                         else:
                             st.error("❌ Scraping Failed")
                             st.markdown(f"**Domain:** {domain}")
                             st.markdown(f"**Status:** Inactive Source")
+                            if url in failures_by_url:
+                                st.markdown(f"**Error:** {failures_by_url[url].get('error', 'Unknown error')}")
         else:
             st.info("No source data available. Generate intelligence first.")
     
@@ -1327,6 +1298,69 @@ def display_unified_dashboard():
                 st.error(f"Error generating PDF: {str(e)}")
                 st.info("Please ensure all analysis data is available before exporting.")
 
+def display_cache_stats(intelligence_data):
+    """Display search and LLM cache effectiveness for the current run, counted process-wide while it ran"""
+    search_cache_stats = intelligence_data.get('search_cache_stats')
+    if search_cache_stats:
+        lookups = search_cache_stats['hits'] + search_cache_stats['misses']
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("Search Cache Hits", search_cache_stats['hits'])
+        
+        with col2:
+            st.metric("Search Cache Misses", search_cache_stats['misses'])
+        
+        with col3:
+            hit_rate = (search_cache_stats['hits'] / lookups * 100) if lookups else 0
+            st.metric("Cache Hit Rate", f"{hit_rate:.1f}%")
+        
+        with col4:
+            st.metric("Cached Searches", search_cache_stats['entries'])
+    
+    llm_cache_stats = intelligence_data.get('llm_cache_stats')
+    if llm_cache_stats:
+        lookups = llm_cache_stats['hits'] + llm_cache_stats['misses']
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("LLM Cache Hits", f"{llm_cache_stats['hits']}/{lookups}")
+        
+        with col2:
+            hit_rate = (llm_cache_stats['hits'] / lookups * 100) if lookups else 0
+            st.metric("LLM Hit Rate", f"{hit_rate:.1f}%")
+        
+        with col3:
+            st.metric("Latency Saved", f"{llm_cache_stats['saved_seconds']:.1f}s")
+        
+        with col4:
+            st.metric("Tokens Saved", f"{llm_cache_stats['saved_tokens']:,}")
+    
+    if intelligence_data.get('cache_stats_shared'):
+        st.caption("Other research ran alongside this run, so these figures include its cache lookups too.")
+
+def display_pipeline_metrics(intelligence_data):
+    """Display per-stage timing, utilization and queue depth for the research pipeline"""
+    pipeline_metrics = intelligence_data.get('pipeline_metrics')
+    if not pipeline_metrics:
+        return
+    
+    with st.expander(f"⚙️ Pipeline Timing ({pipeline_metrics['total_seconds']:.1f}s end to end)", expanded=False):
+        rows = [
+            {
+                'Stage': name.title(),
+                'Items': stage['items'],
+                'Workers': stage['workers'],
+                'Started (s)': stage['start_seconds'],
+                'Duration (s)': stage['wall_seconds'],
+                'Utilization': f"{stage['utilization'] * 100:.0f}%",
+                'Avg Queue': stage['avg_queue_depth'],
+                'Max Queue': stage['max_queue_depth']
+            }
+            for name, stage in pipeline_metrics['stages'].items()
+        ]
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
 def display_single_category_dashboard():
     """Display the unified dashboard when no categories are available"""
     st.markdown("### 📊 Market Intelligence Dashboard")
@@ -1532,6 +1566,7 @@ def execute_personalized_search(queries, market, output_format):
         from utils.search_google import search_google
         from utils.scrape_url import scrape_urls
         from utils.personalized_scanning import generate_personalized_template
+        from utils.search_index import SearchResultIndex
         
         # Progress indicator
         progress_bar = st.progress(0)
@@ -1539,16 +1574,17 @@ def execute_personalized_search(queries, market, output_format):
         
         # Execute searches for personalized queries
         status_text.text("🔍 Executing personalized search queries...")
-        all_results = []
+        search_index = SearchResultIndex([query.get('query', '') for query in queries])
         for i, query in enumerate(queries):
             try:
                 search_results = search_google(query.get('query', ''), num_results=5)
-                all_results.extend(search_results)
+                search_index.add(i, search_results)
                 progress_bar.progress((i + 1) / len(queries) * 0.5)
             except Exception as e:
                 st.warning(f"Search failed for query: {query.get('query', 'Unknown')}")
                 continue
         
+        all_results = search_index.unique_results()
         if not all_results:
             st.error("No search results found. Please try with different queries.")
             return
@@ -1556,7 +1592,7 @@ def execute_personalized_search(queries, market, output_format):
         # Scrape content
         status_text.text("📰 Scraping content from sources...")
         urls_to_scrape = [result['link'] for result in all_results[:15]]
-        scraped_content = scrape_urls(urls_to_scrape, max_workers=3)
+        scraped_content, _ = deduplicate_sources(scrape_urls(urls_to_scrape, max_workers=3))
         progress_bar.progress(0.8)
         
         # Generate personalized template
@@ -2276,6 +2312,145 @@ def render_supply_chain_dashboard():
             st.markdown("• **H&S process review** - Prevent future compliance failures")
             st.markdown("• **Budget compliance** - Address 82.4% performance gap")
 
+def submit_research_jobs(categories, market, timescale, research_depth, separate_jobs=False, incremental=False):
+    """
+    Queue research as background jobs, one per category when separate_jobs is set.
+    
+    A request with a fresh stored run (pre-warmed or recent) at research_depth or deeper
+    is not queued; the summaries of those runs are returned so the caller can load them instead.
+    """
+    runner = get_job_runner()
+    groups = [[category] for category in categories] if separate_jobs else [categories]
+    fresh_runs = []
+    
+    for group in groups:
+        fresh_run = None if incremental else find_fresh_run(group, market, timescale, research_depth)
+        if fresh_run:
+            fresh_runs.append(fresh_run)
+            continue
+        
+        job_id = runner.submit({
+            'categories': group,
+            'market': market,
+            'timescale': timescale,
+            'research_depth': research_depth,
+            'user_input': st.session_state.current_user_input,
+            'incremental': incremental
+        })
+        st.session_state.research_jobs.append(job_id)
+    
+    return fresh_runs
+
+def load_research_run(run_id):
+    """Load a stored research run into the dashboard; returns False if it has expired"""
+    intelligence_data = get_run_store().get(run_id)
+    if intelligence_data is None:
+        return False
+    
+    st.session_state.intelligence_data = intelligence_data
+    st.session_state.current_categories = intelligence_data['categories']
+    return True
+
+def load_research_job(job_id):
+    """Load a finished job's run into the dashboard; returns False if the run has expired"""
+    job = get_job_runner().get(job_id)
+    if job_id not in st.session_state.loaded_research_jobs:
+        st.session_state.loaded_research_jobs.append(job_id)
+    return bool(job and job['run_id']) and load_research_run(job['run_id'])
+
+def display_research_jobs(polling=False):
+    """Display queued and running research jobs with their progress and live previews"""
+    runner = get_job_runner()
+    jobs = runner.list_jobs(st.session_state.research_jobs)
+    if not jobs:
+        return
+    
+    st.markdown("### 🗂️ Research Jobs")
+    if st.session_state.get('research_job_notice'):
+        st.warning(st.session_state.pop('research_job_notice'))
+    status_icons = {'queued': '⏳', 'running': '🔄', 'done': '✅', 'failed': '❌', 'cancelled': '🚫'}
+    
+    for job in jobs:
+        request = job['request']
+        partial = job['partial']
+        label = f"{status_icons.get(job['status'], '•')} {', '.join(request['categories'])} | {request['market']} | {request['research_depth']}"
+        
+        with st.expander(label, expanded=job['status'] == 'running'):
+            if job['status'] in ACTIVE_STATUSES:
+                st.progress(job['progress'], text=f"{job['status'].title()}: {job['stage'] or 'waiting for a worker'}")
+                if partial:
+                    st.caption(f"{partial.get('searched', 0)}/{len(partial.get('queries', []))} searches | ✅ {partial.get('scraped', 0)} scraped | ❌ {partial.get('failed', 0)} failed")
+                    display_category_previews(request['categories'], partial.get('previews', {}), partial.get('category_analyses', {}))
+                if st.button("Cancel", key=f"cancel_job_{job['id']}"):
+                    runner.cancel(job['id'])
+            elif job['status'] == 'done':
+                st.caption(f"Completed in {job['finished_at'] - job['started_at']:.0f}s")
+                if st.button("📊 Show in dashboard", key=f"load_job_{job['id']}"):
+                    if load_research_job(job['id']):
+                        st.rerun()
+                    else:
+                        st.warning("This run has expired from the run store")
+            elif job['status'] == 'failed':
+                st.error(f"Research failed: {job['error']}")
+    
+    # Show the newest finished job as soon as it completes, once
+    for job in jobs:
+        if job['status'] == 'done':
+            if job['id'] not in st.session_state.loaded_research_jobs:
+                if not load_research_job(job['id']):
+                    # Shown by the panel after the rerun
+                    st.session_state.research_job_notice = f"The run for {', '.join(job['request']['categories'])} has expired from the run store"
+                st.rerun()
+            break
+    
+    # Rerun the whole page to stop polling once every job has settled
+    if polling and not any(job['status'] in ACTIVE_STATUSES for job in jobs):
+        st.rerun()
+
+def display_recent_runs():
+    """Display stored research runs so earlier results reload without repeating the research"""
+    store = get_run_store()
+    runs = store.list_runs(limit=50)
+    if not runs:
+        return
+    
+    with st.expander(f"📂 Recent Research Runs ({len(runs)})", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            category_filter = st.selectbox(
+                "Category:",
+                ["All"] + sorted({category for run in runs for category in run['categories']}),
+                key="recent_runs_category"
+            )
+        with col2:
+            market_filter = st.selectbox(
+                "Market:",
+                ["All"] + sorted({run['market'] for run in runs}),
+                key="recent_runs_market"
+            )
+        
+        if category_filter != "All" or market_filter != "All":
+            runs = store.list_runs(
+                category=None if category_filter == "All" else category_filter,
+                market=None if market_filter == "All" else market_filter,
+                limit=50
+            )
+        if not runs:
+            st.info("No stored runs match these filters")
+            return
+        
+        labels = {
+            run['id']: f"{datetime.fromtimestamp(run['created_at']).strftime('%d %b %H:%M')} | {', '.join(run['categories'])} | {run['market']} | {run['timescale']} | {run['sources']} sources"
+            for run in runs
+        }
+        run_id = st.selectbox("Run:", list(labels), format_func=labels.get, key="recent_runs_select")
+        
+        if st.button("📊 Load run", key="load_recent_run"):
+            if load_research_run(run_id):
+                st.rerun()
+            else:
+                st.warning("This run has expired from the run store")
+
 def render_market_intelligence_tab():
     """Render the market intelligence tab with existing functionality"""
     st.markdown("# 🎯 Market Intelligence")
@@ -2375,15 +2550,45 @@ def render_market_intelligence_tab():
             st.markdown(f"- **Time Scope:** {st.session_state.current_timescale}")
             st.markdown(f"- **Research Depth:** {st.session_state.current_research_depth}")
             
+            separate_jobs = st.checkbox(
+                "Queue each category as its own job",
+                value=False,
+                key="separate_research_jobs",
+                help="Categories finish independently and their jobs run in parallel"
+            )
+            incremental = st.checkbox(
+                "Incremental refresh",
+                value=False,
+                key="incremental_research",
+                help="Update the last stored run for the same categories, market and time scope, analyzing only sources that are new or changed since then"
+            )
+            
             if st.button("🚀 Start Research", type="primary", key="start_market_research"):
-                execute_research_workflow(
-                    selected_categories, 
-                    st.session_state.current_market, 
-                    st.session_state.current_timescale, 
-                    st.session_state.current_research_depth
-                )
+                if UTILS_AVAILABLE:
+                    # Research runs on background workers so it survives reruns while the dashboard stays usable
+                    fresh_runs = submit_research_jobs(
+                        selected_categories,
+                        st.session_state.current_market,
+                        st.session_state.current_timescale,
+                        st.session_state.current_research_depth,
+                        separate_jobs,
+                        incremental
+                    )
+                    if fresh_runs and load_research_run(fresh_runs[0]['id']):
+                        ready_at = datetime.fromtimestamp(fresh_runs[0]['created_at']).strftime('%d %b %H:%M')
+                        st.success(f"⚡ Loaded stored {fresh_runs[0]['research_depth']} research from {ready_at}" + (f"; {len(fresh_runs) - 1} more ready under Recent Research Runs" if len(fresh_runs) > 1 else ""))
+                else:
+                    st.error("Market intelligence functionality requires additional utility modules. This demo shows the dashboard interface only.")
                 st.session_state.show_category_selection = False
     
+    if UTILS_AVAILABLE:
+        display_recent_runs()
+    
+    if UTILS_AVAILABLE and st.session_state.research_jobs:
+        st.divider()
+        jobs_active = any(job['status'] in ACTIVE_STATUSES for job in get_job_runner().list_jobs(st.session_state.research_jobs))
+        st.fragment(display_research_jobs, run_every=JOB_POLL_SECONDS if jobs_active else None)(polling=jobs_active)
+    
     st.divider()
     
     # Display results section
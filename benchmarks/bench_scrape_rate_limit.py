@@ -0,0 +1,112 @@
+"""
+Benchmark: scrape wall-clock time with the old fixed 0.5s sleep vs the per-host token bucket.
+
+Replays a URL set with per-URL fetch latencies using sleeps, so results are repeatable and
+no site is contacted. Also reports the peak request rate seen by any single host.
+
+The default data set (benchmarks/data/synthetic_deep_run_urls.json) is synthetic: 25 made-up
+article URLs over 12 real construction-news hosts, several hosts repeated as in a Deep run,
+with generated latencies. Its speed-up shows the scheduling effect, not a measured site run.
+Pass --record with a file of real URLs to measure their latencies against the live sites
+(written to benchmarks/data/recorded_deep_run_urls.json) and replay those instead.
+
+Usage:
+    python benchmarks/bench_scrape_rate_limit.py [--workers 8] [--record urls.txt]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.rate_limit import HostRateLimiter, host_for_url, interleave_by_host
+
+SYNTHETIC_DATA_FILE = os.path.join(os.path.dirname(__file__), "data", "synthetic_deep_run_urls.json")
+RECORDED_DATA_FILE = os.path.join(os.path.dirname(__file__), "data", "recorded_deep_run_urls.json")
+
+def record(url_file):
+    import requests
+    recorded = []
+    with open(url_file) as f:
+        for url in (line.strip() for line in f if line.strip()):
+            start = time.perf_counter()
+            try:
+                requests.get(url, timeout=(10, 30))
+            except Exception as e:
+                print(f"  {url}: {e}")
+            recorded.append({"url": url, "latency": round(time.perf_counter() - start, 3)})
+    with open(RECORDED_DATA_FILE, "w") as f:
+        json.dump(recorded, f, indent=2)
+    print(f"Recorded {len(recorded)} URLs to {RECORDED_DATA_FILE}")
+
+class RequestLog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.starts = defaultdict(list)
+    
+    def fetch(self, item):
+        with self._lock:
+            self.starts[host_for_url(item["url"])].append(time.monotonic())
+        time.sleep(item["latency"])
+    
+    def peak_host_rate(self, window=1.0):
+        peak = 0
+        for starts in self.starts.values():
+            starts = sorted(starts)
+            for i, start in enumerate(starts):
+                peak = max(peak, sum(1 for s in starts[i:] if s - start < window))
+        return peak
+
+def run_fixed_sleep(items, workers):
+    log = RequestLog()
+    def scrape(item):
+        time.sleep(0.5)
+        log.fetch(item)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(scrape, items))
+    return time.perf_counter() - start, log.peak_host_rate()
+
+def run_token_bucket(items, workers):
+    log = RequestLog()
+    limiter = HostRateLimiter()
+    by_url = {item["url"]: item for item in items}
+    def scrape(url):
+        limiter.acquire(url)
+        log.fetch(by_url[url])
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(scrape, interleave_by_host(list(by_url))))
+    return time.perf_counter() - start, log.peak_host_rate()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8, help="scrape workers (Deep uses 8)")
+    parser.add_argument("--record", metavar="URL_FILE", help="re-record latencies from a file of URLs")
+    args = parser.parse_args()
+    
+    data_file = SYNTHETIC_DATA_FILE
+    if args.record:
+        record(args.record)
+        data_file = RECORDED_DATA_FILE
+    
+    with open(data_file) as f:
+        items = json.load(f)
+    
+    hosts = {host_for_url(item["url"]) for item in items}
+    print(f"{len(items)} URLs over {len(hosts)} hosts, {args.workers} workers ({'recorded' if args.record else 'synthetic'} latencies)")
+    
+    fixed_time, fixed_peak = run_fixed_sleep(items, args.workers)
+    bucket_time, bucket_peak = run_token_bucket(items, args.workers)
+    print(f"fixed 0.5s sleep  {fixed_time:6.2f} s | peak {fixed_peak} requests/s to one host")
+    print(f"token bucket      {bucket_time:6.2f} s | peak {bucket_peak} requests/s to one host")
+    print(f"speed-up          {fixed_time / bucket_time:6.2f}x")
+
+if __name__ == "__main__":
+    main()
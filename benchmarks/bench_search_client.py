@@ -0,0 +1,81 @@
+"""
+Benchmark: per-query Custom Search client setup, build() per query vs the shared client pool.
+
+Offline mode (default) measures only client construction, which is what every query paid
+before the pool existed: loading and parsing the discovery document and creating a new
+HTTP transport. Live mode (--live) also issues the real Deep-run queries, so connection
+reuse shows up too; it needs GOOGLE_API_KEY and SEARCH_CX and spends quota.
+
+Usage:
+    python benchmarks/bench_search_client.py [--queries 15] [--live]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httplib2
+from googleapiclient.discovery import build
+
+from utils.intelligent_query import generate_fallback_queries
+from utils.search_google import SearchClientPool
+
+def time_unpooled(api_key, queries, search_engine_id=None):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        service = build("customsearch", "v1", developerKey=api_key, http=httplib2.Http(timeout=20))
+        if search_engine_id:
+            service.cse().list(q=query, cx=search_engine_id, num=10).execute()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def time_pooled(api_key, queries, search_engine_id=None):
+    pool = SearchClientPool(api_key, timeout=20, max_size=1)
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        with pool.checkout() as service:
+            if search_engine_id:
+                service.cse().list(q=query, cx=search_engine_id, num=10).execute()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def report(label, timings):
+    print(f"{label:<10} total {sum(timings) * 1000:8.1f} ms | "
+          f"mean {statistics.mean(timings) * 1000:7.2f} ms/query | "
+          f"median {statistics.median(timings) * 1000:7.2f} ms/query")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=15, help="queries per run (a Deep run issues 15)")
+    parser.add_argument("--live", action="store_true", help="issue real Custom Search requests")
+    args = parser.parse_args()
+    
+    api_key = os.getenv("GOOGLE_API_KEY", "benchmark-key")
+    search_engine_id = None
+    if args.live:
+        search_engine_id = os.getenv("SEARCH_CX")
+        if not os.getenv("GOOGLE_API_KEY") or not search_engine_id:
+            parser.error("--live needs GOOGLE_API_KEY and SEARCH_CX")
+    
+    queries = [q["query"] for q in generate_fallback_queries("Steel & Metals", "UK", research_depth="Deep (20 queries)")]
+    queries = (queries * (args.queries // len(queries) + 1))[:args.queries]
+    
+    # Warm imports and the bundled discovery document once so neither side pays first-use cost
+    build("customsearch", "v1", developerKey=api_key, http=httplib2.Http())
+    
+    print(f"Deep run: {len(queries)} queries ({'live' if args.live else 'client setup only'})")
+    unpooled = time_unpooled(api_key, queries, search_engine_id)
+    pooled = time_pooled(api_key, queries, search_engine_id)
+    report("build()", unpooled)
+    report("pooled", pooled)
+    saved = (sum(unpooled) - sum(pooled)) / len(queries)
+    print(f"saved      {saved * 1000:7.2f} ms/query, {(sum(unpooled) - sum(pooled)) * 1000:.1f} ms per run")
+
+if __name__ == "__main__":
+    main()
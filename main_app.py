@@ -9,6 +9,7 @@ import threading
 import time
 import os
 from flask import Flask, render_template_string
+from utils.prewarm import start_prewarm_scheduler
 
 # Flask app for the main interface
 app = Flask(__name__)
@@ -111,6 +112,9 @@ def run_flask():
     app.run(host='0.0.0.0', port=8000, debug=False)
 
 if __name__ == '__main__':
+    # Keep the common category/market runs pre-computed off-hours
+    start_prewarm_scheduler()
+    
     # Start Streamlit in a separate thread
     streamlit_thread = threading.Thread(target=run_streamlit)
     streamlit_thread.daemon = True
@@ -159,7 +159,7 @@ class SmartAcquisitionComponent:
                 all_urls = []
                 for query_data in queries_data:
                     search_results = search_google(
-                        query_data['optimized_query'], 
+                        query_data['query'], 
                         num_results=5,
                         time_filter=format_time_filter(timescale)
                     )
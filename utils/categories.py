@@ -0,0 +1,20 @@
+"""
+Categories - Procurement categories the dashboard knows by name, with their short tab labels
+"""
+
+# Common procurement categories and the short names used for dashboard tabs; also the
+# set of categories the pre-warm scheduler keeps fresh
+CATEGORY_SHORT_NAMES = {
+    "Steel, Iron & Non-Ferrous Metal Construction": "Steel & Metals",
+    "Electrical Installation & Maintenance": "Electrical",
+    "Mechanical Installation & Maintenance": "Mechanical",
+    "Built-Asset Infrastructure & Civil Engineering": "Infrastructure",
+    "Facilities Management & Maintenance": "Facilities",
+    "Construction & Building Materials": "Construction",
+    "Energy & Power Generation": "Energy",
+    "Transportation & Logistics": "Transport",
+    "Water & Wastewater Management": "Water",
+    "Telecommunications & IT Infrastructure": "IT & Telecom",
+    "Security & Safety Systems": "Security",
+    "Environmental & Waste Management": "Environment"
+}
@@ -1,173 +1,91 @@
-import os
-from openai import OpenAI
 import json
 import re
+from utils.llm_client import create_chat_completion, stream_chat_completion, get_openai_client
+from utils.context_packer import pack_sources, format_packed_sources
+from utils.source_facts import extract_source_facts, facts_for_category
+from utils.partial_json import PartialJSONParser
 
-def analyze_category_specific_data(category, market, scraped_content):
+# Prompt tokens given to source passages; the schema and instructions add roughly 1.5k more
+CATEGORY_CONTEXT_TOKENS = 24000
+
+# Bookkeeping fields added after generation, left out when an analysis is shown back to the model
+ANALYSIS_METADATA_FIELDS = ('source_tokens', 'analysis_mode')
+
+def analyze_category_specific_data(category, market, scraped_content, map_reduce_threshold=None, map_concurrency=4, source_facts=None, on_partial=None, previous_analysis=None):
     """
-    Analyze scraped market data for a specific category with personalized insights
+    Analyze scraped market data for a specific category with personalized insights.
+    
+    In map-reduce mode the category JSON is synthesized from per-document fact sheets
+    instead of the page text: either source_facts extracted once for the whole run, or,
+    with map_reduce_threshold set and at least that many sources, sheets extracted here.
+    Fact sheets are category-agnostic and cached per document, so only the facts
+    relevant to this category are packed into its prompt.
+    
+    With on_partial set, the response is streamed and on_partial(partial analysis) is
+    called from this thread each time another section of the JSON completes.
+    
+    With previous_analysis set, scraped_content holds only sources that are new since
+    that analysis and the model returns it updated with their findings, so a refresh
+    does not re-read sources that were already analyzed.
     """
     try:
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = get_openai_client()
         
-        # Combine all scraped content with source tracking
-        source_content = []
-        for content in scraped_content:
-            if content['content']:
-                source_content.append({
-                    'url': content['url'],
-                    'content': content['content'][:3000],
-                    'domain': content['url'].split('/')[2] if '/' in content['url'] else content['url']
-                })
-        
-        if not source_content:
+        sources = [item for item in scraped_content if item.get('content')]
+        if not sources:
             return {"error": "No content available for analysis"}
         
-        combined_content = "\n\n".join([
-            f"Source: {content['url']}\nDomain: {content['domain']}\nContent: {content['content']}" 
-            for content in source_content
-        ])
+        if source_facts is None and map_reduce_threshold and len(sources) >= map_reduce_threshold:
+            source_facts, _ = extract_source_facts(sources, concurrency=map_concurrency, client=client)
         
-        category_prompt = f"""
-        Analyze the following market intelligence specifically for {category} in {market} market:
+        analysis_mode = 'single_pass'
+        source_content = []
+        if source_facts:
+            # Fact sheets are packed too, keeping the reduce prompt bounded however many sources there are
+            source_content, source_tokens = pack_sources(facts_for_category(source_facts, category), CATEGORY_CONTEXT_TOKENS, query=f"{category} {market}")
+            if source_content:
+                analysis_mode = 'map_reduce'
         
-        Sources: {combined_content}
+        if not source_content:
+            # Pack the most relevant passages of every source into the prompt's token budget
+            source_content, source_tokens = pack_sources(sources, CATEGORY_CONTEXT_TOKENS, query=f"{category} {market}")
         
-        CRITICAL INSTRUCTIONS:
-        1. Focus exclusively on {category} - all insights must be specific to this category
-        2. Extract ONLY quantitative data (numbers, percentages, financial figures, dates, metrics)
-        3. NO HTML tags in responses - use plain text only
-        4. Provide category-specific analysis that would be different for other categories
-        5. Look for: market size, growth rates, pricing data, tender values, company revenues, employment figures, cost changes, capacity numbers, production volumes, market share percentages
+        if not source_content:
+            return {"error": "No content available for analysis"}
         
-        Provide analysis in JSON format:
-        {{
-            "category_name": "{category}",
-            "executive_summary": {{
-                "key_recommendation": "Primary strategic recommendation specific to {category}",
-                "urgency_level": "High/Medium/Low",
-                "decision_window": "Immediate/3-6 months/6-12 months",
-                "confidence_level": "High/Medium/Low"
-            }},
-            "insights": [
-                {{
-                    "headline": "Category-specific finding with numbers",
-                    "explanation": "Detailed explanation with quantitative data for {category}",
-                    "evidence": "Supporting evidence with specific metrics - NO HTML TAGS",
-                    "confidence": "High/Medium/Low",
-                    "sources_count": number_of_sources,
-                    "emoji": "📊",
-                    "key_metrics": [
-                        {{
-                            "metric": "Metric name",
-                            "value": "Quantitative value",
-                            "context": "Context or time period"
-                        }}
-                    ],
-                    "source_urls": ["url1", "url2"],
-                    "quantitative_data": "Specific numbers or percentages",
-                    "impact_assessment": "Business impact assessment",
-                    "market_implications": "Strategic market implications",
-                    "urgency": "High/Medium/Low"
-                }}
-            ],
-            "market_players": [
-                {{
-                    "company": "Company name",
-                    "market_share": "Market share percentage or description",
-                    "strengths": "Key competitive strengths",
-                    "key_products": "Main products/services",
-                    "recent_developments": "Recent company developments"
-                }}
-            ],
-            "cost_analysis": {{
-                "cost_trends": [
-                    "Cost trend with specific data",
-                    "Price movement with quantitative details"
-                ],
-                "price_drivers": [
-                    "Key factor affecting pricing",
-                    "Economic driver with impact description"
-                ],
-                "market_rates": "Current market rates or pricing ranges",
-                "cost_projections": "Future cost projections if available"
-            }},
-            "supply_chain": {{
-                "risks": [
-                    "Supply chain risk with specific details",
-                    "Operational risk with quantitative impact"
-                ],
-                "suppliers": [
-                    "Key supplier with market presence",
-                    "Important supplier with specialization"
-                ],
-                "capacity_constraints": "Capacity limitations if identified",
-                "lead_times": "Typical lead times for {category}"
-            }},
-            "growth_trends": {{
-                "indicators": [
-                    "Growth indicator with specific metrics",
-                    "Market expansion data with percentages"
-                ],
-                "outlook": "Future market outlook with quantitative projections",
-                "growth_drivers": [
-                    "Factor driving growth with impact measurement",
-                    "Market catalyst with expected outcomes"
-                ],
-                "market_maturity": "Assessment of market maturity stage"
-            }},
-            "market_dynamics": {{
-                "key_trends": [
-                    {{
-                        "trend": "Trend specific to {category}",
-                        "quantitative_data": "Specific numbers or percentages",
-                        "source_evidence": "Evidence without HTML tags",
-                        "impact": "High/Medium/Low",
-                        "source_urls": ["url1", "url2"]
-                    }}
-                ]
-            }},
-            "market_opportunities": [
-                {{
-                    "opportunity": "Opportunity specific to {category}",
-                    "quantitative_potential": "Specific value or percentage",
-                    "source_evidence": "Evidence without HTML tags",
-                    "recommended_action": "Action specific to {category}",
-                    "source_urls": ["url1", "url2"]
-                }}
-            ],
-            "risk_flags": [
-                {{
-                    "risk_type": "Risk specific to {category}",
-                    "description": "Risk description without HTML tags",
-                    "likelihood": "High/Medium/Low",
-                    "impact": "High/Medium/Low",
-                    "mitigation": "Mitigation strategy for {category}",
-                    "source_urls": ["url1", "url2"]
-                }}
-            ],
-            "strategic_recommendations": [
-                {{
-                    "recommendation": "Recommendation specific to {category}",
-                    "rationale": "Rationale without HTML tags",
-                    "timeline": "Implementation timeframe",
-                    "category_specific": true,
-                    "source_urls": ["url1", "url2"]
-                }}
-            ]
-        }}
+        combined_content = format_packed_sources(source_content)
+        category_prompt = build_category_prompt(
+            category, market, combined_content,
+            fact_sheets=analysis_mode == 'map_reduce',
+            previous_analysis=previous_analysis
+        )
         
-        IMPORTANT: All content must be specific to {category} and contain NO HTML tags.
-        """
+        messages = [
+            {"role": "system", "content": f"You are a procurement intelligence specialist focused on {category} market analysis. Never include HTML tags in your responses."},
+            {"role": "user", "content": category_prompt}
+        ]
         
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": f"You are a procurement intelligence specialist focused on {category} market analysis. Never include HTML tags in your responses."},
-                {"role": "user", "content": category_prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
+        if on_partial:
+            parser = PartialJSONParser()
+            
+            def on_delta(text):
+                if parser.feed(text):
+                    on_partial(clean_html_tags(parser.snapshot()))
+            
+            response = stream_chat_completion(
+                client,
+                on_delta=on_delta,
+                model="gpt-4o",
+                messages=messages,
+                response_format={"type": "json_object"}
+            )
+        else:
+            response = create_chat_completion(
+                client,
+                model="gpt-4o",
+                messages=messages,
+                response_format={"type": "json_object"}
+            )
         
         result = json.loads(response.choices[0].message.content)
         
@@ -178,11 +96,171 @@ def analyze_category_specific_data(category, market, scraped_content):
         source_urls = [content['url'] for content in source_content]
         result = add_source_urls(result, source_urls)
         
+        # Tokens each source contributed to the prompt
+        result['source_tokens'] = source_tokens
+        result['analysis_mode'] = analysis_mode
+        if previous_analysis:
+            result['source_tokens'] = {**previous_analysis.get('source_tokens', {}), **source_tokens}
+            result['analysis_mode'] = 'incremental'
+        
         return result
         
     except Exception as e:
         return {"error": f"Category analysis failed: {str(e)}"}
 
+def build_category_prompt(category, market, combined_content, fact_sheets=False, previous_analysis=None):
+    """
+    Category analysis prompt and JSON schema, over either packed page text or fact sheets,
+    optionally as an update of a previous analysis
+    """
+    source_note = ""
+    if fact_sheets:
+        source_note = "\n    Each source below is a fact sheet extracted from one page; treat its facts as quoted from that source.\n"
+    if previous_analysis:
+        previous = {key: value for key, value in previous_analysis.items() if key not in ANALYSIS_METADATA_FIELDS}
+        source_note += f"""
+    PREVIOUS ANALYSIS of earlier sources for {category}:
+    {json.dumps(previous, ensure_ascii=False)}
+    
+    The sources below are only those that are new or have changed since the previous analysis.
+    Return the complete updated analysis: keep previous findings and their source_urls unless the
+    new sources contradict or supersede them, update figures the new sources revise, and add
+    findings the new sources support.
+"""
+
+    return f"""
+    Analyze the following market intelligence specifically for {category} in {market} market:
+    {source_note}
+    Sources: {combined_content}
+    
+    CRITICAL INSTRUCTIONS:
+    1. Focus exclusively on {category} - all insights must be specific to this category
+    2. Extract ONLY quantitative data (numbers, percentages, financial figures, dates, metrics)
+    3. NO HTML tags in responses - use plain text only
+    4. Provide category-specific analysis that would be different for other categories
+    5. Look for: market size, growth rates, pricing data, tender values, company revenues, employment figures, cost changes, capacity numbers, production volumes, market share percentages
+    6. A source with "Also published at" URLs is one text syndicated at several addresses: cite all of its URLs but count it once in sources_count
+    
+    Provide analysis in JSON format:
+    {{
+        "category_name": "{category}",
+        "executive_summary": {{
+            "key_recommendation": "Primary strategic recommendation specific to {category}",
+            "urgency_level": "High/Medium/Low",
+            "decision_window": "Immediate/3-6 months/6-12 months",
+            "confidence_level": "High/Medium/Low"
+        }},
+        "insights": [
+            {{
+                "headline": "Category-specific finding with numbers",
+                "explanation": "Detailed explanation with quantitative data for {category}",
+                "evidence": "Supporting evidence with specific metrics - NO HTML TAGS",
+                "confidence": "High/Medium/Low",
+                "sources_count": number_of_sources,
+                "emoji": "📊",
+                "key_metrics": [
+                    {{
+                        "metric": "Metric name",
+                        "value": "Quantitative value",
+                        "context": "Context or time period"
+                    }}
+                ],
+                "source_urls": ["url1", "url2"],
+                "quantitative_data": "Specific numbers or percentages",
+                "impact_assessment": "Business impact assessment",
+                "market_implications": "Strategic market implications",
+                "urgency": "High/Medium/Low"
+            }}
+        ],
+        "market_players": [
+            {{
+                "company": "Company name",
+                "market_share": "Market share percentage or description",
+                "strengths": "Key competitive strengths",
+                "key_products": "Main products/services",
+                "recent_developments": "Recent company developments"
+            }}
+        ],
+        "cost_analysis": {{
+            "cost_trends": [
+                "Cost trend with specific data",
+                "Price movement with quantitative details"
+            ],
+            "price_drivers": [
+                "Key factor affecting pricing",
+                "Economic driver with impact description"
+            ],
+            "market_rates": "Current market rates or pricing ranges",
+            "cost_projections": "Future cost projections if available"
+        }},
+        "supply_chain": {{
+            "risks": [
+                "Supply chain risk with specific details",
+                "Operational risk with quantitative impact"
+            ],
+            "suppliers": [
+                "Key supplier with market presence",
+                "Important supplier with specialization"
+            ],
+            "capacity_constraints": "Capacity limitations if identified",
+            "lead_times": "Typical lead times for {category}"
+        }},
+        "growth_trends": {{
+            "indicators": [
+                "Growth indicator with specific metrics",
+                "Market expansion data with percentages"
+            ],
+            "outlook": "Future market outlook with quantitative projections",
+            "growth_drivers": [
+                "Factor driving growth with impact measurement",
+                "Market catalyst with expected outcomes"
+            ],
+            "market_maturity": "Assessment of market maturity stage"
+        }},
+        "market_dynamics": {{
+            "key_trends": [
+                {{
+                    "trend": "Trend specific to {category}",
+                    "quantitative_data": "Specific numbers or percentages",
+                    "source_evidence": "Evidence without HTML tags",
+                    "impact": "High/Medium/Low",
+                    "source_urls": ["url1", "url2"]
+                }}
+            ]
+        }},
+        "market_opportunities": [
+            {{
+                "opportunity": "Opportunity specific to {category}",
+                "quantitative_potential": "Specific value or percentage",
+                "source_evidence": "Evidence without HTML tags",
+                "recommended_action": "Action specific to {category}",
+                "source_urls": ["url1", "url2"]
+            }}
+        ],
+        "risk_flags": [
+            {{
+                "risk_type": "Risk specific to {category}",
+                "description": "Risk description without HTML tags",
+                "likelihood": "High/Medium/Low",
+                "impact": "High/Medium/Low",
+                "mitigation": "Mitigation strategy for {category}",
+                "source_urls": ["url1", "url2"]
+            }}
+        ],
+        "strategic_recommendations": [
+            {{
+                "recommendation": "Recommendation specific to {category}",
+                "rationale": "Rationale without HTML tags",
+                "timeline": "Implementation timeframe",
+                "category_specific": true,
+                "source_urls": ["url1", "url2"]
+            }}
+        ]
+    }}
+    
+    IMPORTANT: All content must be specific to {category} and contain NO HTML tags.
+    """
+
 def clean_html_tags(data):
     """
     Recursively clean HTML tags from data structure
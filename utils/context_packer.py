@@ -0,0 +1,221 @@
+"""
+Context Packer - Fit the most relevant passages of scraped sources into a prompt token budget
+"""
+
+import re
+
+# Optional, not a declared dependency: without it token counts use the chars-per-token estimate
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Target size of a packing unit; paragraphs are merged up to this and long ones split by sentence
+CHUNK_TOKENS = 200
+
+# Characters per token used for the token estimate (a conservative figure for English prose)
+APPROX_CHARS_PER_TOKEN = 4
+
+# Navigation, consent and sharing text that scraped pages carry but no analysis needs
+BOILERPLATE_PATTERN = re.compile(
+    r'cookie|subscribe|newsletter|sign in|log in|sign up|privacy policy|all rights reserved|'
+    r'terms (?:of|and) (?:use|conditions|service)|share (?:this|on)|related (?:articles|stories)|'
+    r'advertisement|javascript|skip to (?:main )?content',
+    re.IGNORECASE
+)
+
+# Figures, currencies and percentages - the quantitative data every prompt asks for
+QUANTITATIVE_PATTERN = re.compile(
+    r'[£$€]\s?\d|\d[\d,.]*\s?(?:%|percent|bn|billion|m\b|million|k\b|thousand|mw|gw|twh|ml)',
+    re.IGNORECASE
+)
+
+STOPWORDS = {'the', 'and', 'for', 'with', 'from', 'market', 'markets', 'services', 'service'}
+
+_encoding = None
+_encoding_failed = False
+
+def count_tokens(text):
+    """
+    Estimated token count for a piece of prompt text.
+    
+    Uses the gpt-4o tokenizer when tiktoken happens to be installed, otherwise
+    APPROX_CHARS_PER_TOKEN; budgets are sized with headroom for the estimate.
+    """
+    global _encoding, _encoding_failed
+    if not text:
+        return 0
+    
+    if tiktoken is not None and not _encoding_failed:
+        try:
+            if _encoding is None:
+                _encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o tokenizer
+            return len(_encoding.encode(text, disallowed_special=()))
+        except Exception:
+            # The encoding file is fetched on first use; fall back if that is not possible
+            _encoding_failed = True
+    
+    return max(1, len(text) // APPROX_CHARS_PER_TOKEN)
+
+def query_terms(query):
+    """
+    Lowercased content words of the category/market/query text used to score chunks
+    """
+    return {
+        word for word in re.findall(r'[a-z0-9]+', (query or '').lower())
+        if len(word) > 2 and word not in STOPWORDS
+    }
+
+def split_into_chunks(text, max_tokens=CHUNK_TOKENS):
+    """
+    Split page text into paragraph-aligned chunks of roughly max_tokens each.
+    
+    Returns a list of (chunk text, token count) in document order.
+    """
+    pieces = []
+    for paragraph in re.split(r'\n+', text or ''):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = count_tokens(paragraph)
+        if tokens <= max_tokens:
+            pieces.append((paragraph, tokens))
+            continue
+        for sentence in re.split(r'(?<=[.!?])\s+', paragraph):
+            if not sentence:
+                continue
+            sentence_tokens = count_tokens(sentence)
+            if sentence_tokens <= max_tokens:
+                pieces.append((sentence, sentence_tokens))
+                continue
+            # Unpunctuated runs (tables, lists flattened by extraction) are cut by word count
+            words = sentence.split()
+            step = max(1, len(words) * max_tokens // sentence_tokens)
+            for start in range(0, len(words), step):
+                piece = " ".join(words[start:start + step])
+                pieces.append((piece, count_tokens(piece)))
+    
+    chunks = []
+    current, current_tokens = [], 0
+    for piece, tokens in pieces:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(("\n".join(current), current_tokens))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append(("\n".join(current), current_tokens))
+    
+    return chunks
+
+def score_chunk(chunk, terms):
+    """
+    Relevance of a chunk: query-term hits and quantitative data, penalized for boilerplate.
+    
+    Scores are normalized by chunk length so long chunks do not win on size alone.
+    """
+    words = re.findall(r'[a-z0-9]+', chunk.lower())
+    if not words:
+        return 0.0
+    
+    term_hits = sum(1 for word in words if word in terms)
+    figures = len(QUANTITATIVE_PATTERN.findall(chunk))
+    boilerplate = len(BOILERPLATE_PATTERN.findall(chunk))
+    
+    return (term_hits + 2 * figures - 3 * boilerplate) / len(words) ** 0.5
+
+def source_domain(url):
+    """
+    Host part of a source URL, shown to the model alongside the source
+    """
+    return url.split('/')[2] if '/' in url else url
+
+def source_header(url, domain, include_domain=True, duplicate_urls=()):
+    """
+    Lines introducing a packed source in the prompt: its URL, domain and any syndicated copies
+    """
+    header = f"Source: {url}\n"
+    if include_domain:
+        header += f"Domain: {domain}\n"
+    if duplicate_urls:
+        # Syndicated copies collapsed by deduplication still count as corroborating sources
+        header += f"Also published at: {', '.join(duplicate_urls)}\n"
+    return header + "Content: "
+
+def pack_sources(scraped_content, budget_tokens, query="", include_domain=True, chunk_tokens=CHUNK_TOKENS):
+    """
+    Select the most relevant chunks of scraped content that fit in a token budget.
+    
+    Chunks are picked round-robin across sources - each round every source offers its
+    next-best chunk, most relevant sources first - so one long page cannot crowd the
+    others out. Boilerplate-dominated chunks are never selected. Within a source, the
+    selected chunks keep their original document order.
+    
+    Returns (packed sources, tokens contributed per source URL). Each packed source has
+    'url', 'domain', 'duplicate_urls', 'content' and 'tokens' keys, in the order the
+    sources were given.
+    """
+    terms = query_terms(query)
+    
+    candidates = []
+    for item in scraped_content:
+        if not item.get('content'):
+            continue
+        url = item['url']
+        domain = source_domain(url)
+        ranked = sorted(
+            (
+                (score_chunk(chunk, terms), position, chunk, tokens)
+                for position, (chunk, tokens) in enumerate(split_into_chunks(item['content'], chunk_tokens))
+            ),
+            key=lambda candidate: (-candidate[0], candidate[1])
+        )
+        ranked = [candidate for candidate in ranked if candidate[0] >= 0]
+        if ranked:
+            duplicate_urls = item.get('duplicate_urls', [])
+            header_tokens = count_tokens(source_header(url, domain, include_domain, duplicate_urls))
+            candidates.append({
+                'url': url, 'domain': domain, 'duplicate_urls': duplicate_urls,
+                'ranked': ranked, 'header_tokens': header_tokens, 'selected': []
+            })
+    
+    pick_order = sorted(candidates, key=lambda source: -source['ranked'][0][0])
+    used_tokens = 0
+    round_index = 0
+    while any(round_index < len(source['ranked']) for source in pick_order):
+        for source in pick_order:
+            if round_index >= len(source['ranked']):
+                continue
+            score, position, chunk, tokens = source['ranked'][round_index]
+            cost = tokens + (0 if source['selected'] else source['header_tokens'])
+            if used_tokens + cost <= budget_tokens:
+                source['selected'].append((position, chunk, tokens))
+                used_tokens += cost
+        round_index += 1
+    
+    packed_sources = []
+    source_tokens = {}
+    for source in candidates:
+        if not source['selected']:
+            continue
+        selected = sorted(source['selected'])
+        tokens = source['header_tokens'] + sum(chunk_tokens for _, _, chunk_tokens in selected)
+        packed_sources.append({
+            'url': source['url'],
+            'domain': source['domain'],
+            'duplicate_urls': source['duplicate_urls'],
+            'content': "\n".join(chunk for _, chunk, _ in selected),
+            'tokens': tokens
+        })
+        source_tokens[source['url']] = source_tokens.get(source['url'], 0) + tokens
+    
+    return packed_sources, source_tokens
+
+def format_packed_sources(packed_sources, include_domain=True):
+    """
+    Render packed sources as the Source/Domain/Content text block used in prompts
+    """
+    return "\n\n".join([
+        source_header(source['url'], source['domain'], include_domain, source.get('duplicate_urls', ())) + source['content']
+        for source in packed_sources
+    ])
@@ -0,0 +1,118 @@
+"""
+Source Deduplication - Collapse syndicated and mirrored pages before analysis
+"""
+
+import hashlib
+import heapq
+import re
+from utils.url_utils import canonicalize_url
+
+SHINGLE_WORDS = 5  # words per shingle; long enough that shared phrasing alone does not match
+SKETCH_SIZE = 128  # bottom-k MinHash sketch size; Jaccard estimates are within about +/-0.09
+NEAR_DUPLICATE_THRESHOLD = 0.8  # estimated Jaccard similarity at which two pages are one source
+
+def shingle_hashes(text):
+    """
+    64-bit hashes of the overlapping word shingles in a page's text
+    """
+    words = re.findall(r'\w+', text.lower())
+    if len(words) < SHINGLE_WORDS:
+        words = words + [''] * (SHINGLE_WORDS - len(words))
+    
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode(), digest_size=8).digest(), 'big')
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+def minhash_sketch(text, size=SKETCH_SIZE):
+    """
+    Bottom-k MinHash sketch: the smallest shingle hashes of the text, as a set
+    """
+    return set(heapq.nsmallest(size, shingle_hashes(text)))
+
+def estimate_similarity(sketch_a, sketch_b, size=SKETCH_SIZE):
+    """
+    Estimated Jaccard similarity of two pages from their bottom-k sketches
+    """
+    if not sketch_a or not sketch_b:
+        return 0.0
+    
+    union_sketch = heapq.nsmallest(size, sketch_a | sketch_b)
+    shared = sum(1 for value in union_sketch if value in sketch_a and value in sketch_b)
+    return shared / len(union_sketch)
+
+def deduplicate_sources(scraped_content, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    Collapse scraped records that are the same page or near-duplicate copies of one text.
+    
+    Records are first grouped by canonical URL, then clustered by MinHash similarity of
+    their extracted text. Each cluster is represented by its longest record, which gains
+    a 'duplicate_urls' list naming every other URL the text was found at, so evidence
+    stays attributed to all of them.
+    
+    Returns (deduplicated records in first-seen order, report). The report has the input
+    and unique counts plus every cluster with more than one URL.
+    """
+    records = [record for record in scraped_content if record.get('content')]
+    
+    # Union-find over record indices
+    parent = list(range(len(records)))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    def union(i, j):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    
+    first_by_url = {}
+    for i, record in enumerate(records):
+        canonical_url = canonicalize_url(record['url'])
+        if canonical_url in first_by_url:
+            union(first_by_url[canonical_url], i)
+        else:
+            first_by_url[canonical_url] = i
+    
+    sketches = [minhash_sketch(record['content']) for record in records]
+    for i in range(len(records)):
+        for j in range(i + 1, len(records)):
+            if find(i) != find(j) and estimate_similarity(sketches[i], sketches[j]) >= threshold:
+                union(i, j)
+    
+    clusters = {}
+    for i in range(len(records)):
+        clusters.setdefault(find(i), []).append(i)
+    
+    deduplicated = []
+    report_clusters = []
+    for root in sorted(clusters):
+        members = clusters[root]
+        representative = max(members, key=lambda i: (len(records[i]['content']), -i))
+        urls = []
+        for i in members:
+            if records[i]['url'] not in urls:
+                urls.append(records[i]['url'])
+        
+        kept = dict(records[representative])
+        kept['duplicate_urls'] = [url for url in urls if url != kept['url']]
+        deduplicated.append(kept)
+        
+        if len(members) > 1:
+            report_clusters.append({
+                'url': kept['url'],
+                'duplicate_urls': kept['duplicate_urls'],
+                'size': len(members)
+            })
+    
+    report = {
+        'input_sources': len(records),
+        'unique_sources': len(deduplicated),
+        'duplicates_removed': len(records) - len(deduplicated),
+        'clusters': report_clusters
+    }
+    
+    return deduplicated, report
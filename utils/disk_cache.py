@@ -0,0 +1,129 @@
+"""
+Disk Cache - Small persistent key/value cache shared by the search, LLM and extraction layers
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+import time
+import zlib
+
+def get_cache_dir():
+    """
+    Directory holding the on-disk caches, overridable with SMART_ACQUISITION_CACHE_DIR
+    """
+    cache_dir = os.getenv("SMART_ACQUISITION_CACHE_DIR", ".cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+def hash_key(*parts):
+    """
+    Stable SHA-256 digest of the JSON encoding of the given key parts
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def compress_json(value):
+    """
+    zlib-compressed JSON encoding used for every stored value
+    """
+    return zlib.compress(json.dumps(value).encode("utf-8"))
+
+def decompress_json(blob):
+    """
+    Value stored by compress_json
+    """
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+class DiskCache:
+    """
+    SQLite-backed cache of JSON values with per-entry TTL and least-recently-used eviction.
+    
+    Values are stored zlib-compressed. Hit and miss counters are kept per process so
+    callers can report how often the cache saved a round-trip.
+    """
+    
+    def __init__(self, name, max_entries=5000):
+        self.name = name
+        self.max_entries = max_entries
+        self.path = os.path.join(get_cache_dir(), f"{name}.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        """
+        Return the cached value for key, or None if it is missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        
+        return decompress_json(row[0])
+    
+    def set(self, key, value, ttl):
+        """
+        Store a JSON-serialisable value for ttl seconds, evicting the least recently used entries beyond max_entries
+        """
+        now = time.time()
+        blob = compress_json(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created_at, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, now, now + ttl, now)
+            )
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+    
+    def clear(self):
+        """
+        Remove every entry from the cache
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+    
+    def stats(self):
+        """
+        Hit/miss counters for this process plus the current number of stored entries
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': entries
+        }
@@ -1,169 +1,83 @@
-import os
-from openai import OpenAI
 import json
+from concurrent.futures import ThreadPoolExecutor
+from utils.llm_client import create_chat_completion, get_openai_client
+from utils.context_packer import pack_sources, format_packed_sources
+
+# Independent analysis passes run over the same market data:
+# (result key, prompt file, key in the JSON response, empty default, label for error messages)
+ANALYSIS_PASSES = [
+    ('insights', 'report_insights', 'insights', list, 'insights'),
+    ('themes', 'thematic_analysis', 'themes', dict, 'thematic'),
+    ('risk_flags', 'risk_flags', 'risks', list, 'risk'),
+    ('timeline', 'timeline_events', 'timeline', list, 'timeline'),
+    ('strategic_outlook', 'strategic_outlook', 'strategic_outlook', dict, 'strategic outlook'),
+]
+PASS_TIMEOUT = 90  # seconds allowed for each attempt of a single pass
+CONTEXT_TOKENS = 8000  # prompt tokens of market data shared by the five passes
+
+def run_analysis_pass(client, system_prompt, user_content, response_key, default):
+    """
+    Run one structured-report pass and return its section of the JSON response
+    """
+    response = create_chat_completion(
+        client,
+        model="gpt-4o",
+        messages=[
+            {
+                "role": "system",
+                "content": system_prompt
+            },
+            {
+                "role": "user",
+                "content": user_content
+            }
+        ],
+        response_format={"type": "json_object"},
+        timeout=PASS_TIMEOUT
+    )
+    
+    content = response.choices[0].message.content
+    if content:
+        return json.loads(content).get(response_key, default())
+    return default()
 
 def analyze_market_data(category, market, scraped_content):
     """
-    Analyze scraped market data using GPT-4 with specialized prompts for structured report
+    Analyze scraped market data using GPT-4 with specialized prompts for structured report.
+    
+    The five passes are independent, so they run as one concurrent batch; a failed or
+    timed-out pass only empties its own section.
     """
     # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
     # do not change this unless explicitly requested by the user
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = get_openai_client()
     
-    # Combine all scraped content
-    combined_content = "\n\n".join([item['content'] for item in scraped_content if item['content']])
+    # Pack the most relevant passages of every source into the shared token budget
+    packed_sources, source_tokens = pack_sources(scraped_content, CONTEXT_TOKENS, query=f"{category} {market}", include_domain=False)
+    combined_content = format_packed_sources(packed_sources, include_domain=False)
+    user_content = f"Category: {category}\nMarket: {market}\n\nMarket Data:\n{combined_content}"
     
     # Load prompts for structured report
     prompts = {}
-    prompt_files = [
-        'report_insights.txt', 'thematic_analysis.txt', 'timeline_events.txt', 
-        'strategic_outlook.txt', 'risk_flags.txt'
-    ]
-    
-    for prompt_file in prompt_files:
-        with open(f"prompts/{prompt_file}", "r") as f:
-            prompts[prompt_file.replace('.txt', '')] = f.read()
+    for _, prompt_name, _, _, _ in ANALYSIS_PASSES:
+        with open(f"prompts/{prompt_name}.txt", "r") as f:
+            prompts[prompt_name] = f.read()
     
     analysis_results = {}
     
-    # Top 3 Insights Analysis
-    try:
-        insights_response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": prompts['report_insights']
-                },
-                {
-                    "role": "user",
-                    "content": f"Category: {category}\nMarket: {market}\n\nMarket Data:\n{combined_content[:8000]}"
-                }
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        insights_content = insights_response.choices[0].message.content
-        if insights_content:
-            insights_analysis = json.loads(insights_content)
-            analysis_results['insights'] = insights_analysis.get('insights', [])
-        else:
-            analysis_results['insights'] = []
+    with ThreadPoolExecutor(max_workers=len(ANALYSIS_PASSES)) as executor:
+        futures = {
+            result_key: executor.submit(run_analysis_pass, client, prompts[prompt_name], user_content, response_key, default)
+            for result_key, prompt_name, response_key, default, _ in ANALYSIS_PASSES
+        }
         
-    except Exception as e:
-        print(f"Error in insights analysis: {e}")
-        analysis_results['insights'] = []
+        for result_key, _, _, default, label in ANALYSIS_PASSES:
+            try:
+                analysis_results[result_key] = futures[result_key].result()
+            except Exception as e:
+                print(f"Error in {label} analysis: {e}")
+                analysis_results[result_key] = default()
     
-    # Thematic Analysis
-    try:
-        thematic_response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": prompts['thematic_analysis']
-                },
-                {
-                    "role": "user",
-                    "content": f"Category: {category}\nMarket: {market}\n\nMarket Data:\n{combined_content[:8000]}"
-                }
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        thematic_content = thematic_response.choices[0].message.content
-        if thematic_content:
-            thematic_analysis = json.loads(thematic_content)
-            analysis_results['themes'] = thematic_analysis.get('themes', {})
-        else:
-            analysis_results['themes'] = {}
-        
-    except Exception as e:
-        print(f"Error in thematic analysis: {e}")
-        analysis_results['themes'] = {}
-    
-    # Risk Flags Analysis
-    try:
-        risk_response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": prompts['risk_flags']
-                },
-                {
-                    "role": "user",
-                    "content": f"Category: {category}\nMarket: {market}\n\nMarket Data:\n{combined_content[:8000]}"
-                }
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        risk_content = risk_response.choices[0].message.content
-        if risk_content:
-            risk_analysis = json.loads(risk_content)
-            analysis_results['risk_flags'] = risk_analysis.get('risks', [])
-        else:
-            analysis_results['risk_flags'] = []
-        
-    except Exception as e:
-        print(f"Error in risk analysis: {e}")
-        analysis_results['risk_flags'] = []
-    
-    # Timeline Events Analysis
-    try:
-        timeline_response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": prompts['timeline_events']
-                },
-                {
-                    "role": "user",
-                    "content": f"Category: {category}\nMarket: {market}\n\nMarket Data:\n{combined_content[:8000]}"
-                }
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        timeline_content = timeline_response.choices[0].message.content
-        if timeline_content:
-            timeline_analysis = json.loads(timeline_content)
-            analysis_results['timeline'] = timeline_analysis.get('timeline', [])
-        else:
-            analysis_results['timeline'] = []
-        
-    except Exception as e:
-        print(f"Error in timeline analysis: {e}")
-        analysis_results['timeline'] = []
-    
-    # Strategic Outlook Analysis
-    try:
-        strategic_response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": prompts['strategic_outlook']
-                },
-                {
-                    "role": "user",
-                    "content": f"Category: {category}\nMarket: {market}\n\nMarket Data:\n{combined_content[:8000]}"
-                }
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        strategic_content = strategic_response.choices[0].message.content
-        if strategic_content:
-            strategic_analysis = json.loads(strategic_content)
-            analysis_results['strategic_outlook'] = strategic_analysis.get('strategic_outlook', {})
-        else:
-            analysis_results['strategic_outlook'] = {}
-        
-    except Exception as e:
-        print(f"Error in strategic outlook analysis: {e}")
-        analysis_results['strategic_outlook'] = {}
+    analysis_results['source_tokens'] = source_tokens
     
     return analysis_results
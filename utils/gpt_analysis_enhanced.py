@@ -1,57 +1,67 @@
-import os
-from openai import OpenAI
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.llm_client import create_chat_completion, get_openai_client
+from utils.context_packer import pack_sources, format_packed_sources
+
+CONTEXT_TOKENS = 24000  # prompt tokens of source passages shared by the three passes
 
 def analyze_market_data(category, market, scraped_content):
     """
     Analyze scraped market data using enhanced intelligence synthesis
     """
     try:
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = get_openai_client()
         
-        # Combine all scraped content with source tracking
-        source_content = []
-        for content in scraped_content:
-            if content['content']:
-                source_content.append({
-                    'url': content['url'],
-                    'content': content['content'][:3000],  # Increased content length
-                    'domain': content['url'].split('/')[2] if '/' in content['url'] else content['url']
-                })
+        # Pack the most relevant passages of every source into the token budget shared by all passes
+        source_content, source_tokens = pack_sources(scraped_content, CONTEXT_TOKENS, query=f"{category} {market}")
         
         if not source_content:
             return {"error": "No content available for analysis"}
         
-        # Cross-validation analysis
-        cross_validation_result = perform_cross_validation(client, source_content, category, market)
+        # Build the shared source text once for all three passes
+        combined_content = format_packed_sources(source_content)
         
-        # Intelligence synthesis
-        synthesis_result = perform_intelligence_synthesis(client, source_content, category, market)
+        # Cross-validation, synthesis and actionable intelligence are independent, so run them in parallel
+        passes = {
+            'cross_validation': perform_cross_validation,
+            'intelligence_synthesis': perform_intelligence_synthesis,
+            'actionable_intelligence': generate_actionable_intelligence
+        }
         
-        # Actionable intelligence generation
-        actionable_result = generate_actionable_intelligence(client, source_content, category, market)
+        with ThreadPoolExecutor(max_workers=len(passes)) as executor:
+            futures = {
+                name: executor.submit(timed_pass, analysis_pass, client, combined_content, category, market)
+                for name, analysis_pass in passes.items()
+            }
+            pass_results = {name: future.result() for name, future in futures.items()}
         
         # Combine all analysis results
-        analysis_results = {
-            **cross_validation_result,
-            **synthesis_result,
-            **actionable_result
-        }
+        analysis_results = {}
+        for name in passes:
+            analysis_results.update(pass_results[name][0])
+        
+        # Seconds spent in each pass, to show which one bounds end-to-end latency
+        analysis_results['pass_latency'] = {name: round(pass_results[name][1], 2) for name in passes}
+        analysis_results['source_tokens'] = source_tokens
         
         return analysis_results
         
     except Exception as e:
         return {"error": f"Analysis failed: {str(e)}"}
 
-def perform_cross_validation(client, source_content, category, market):
+def timed_pass(analysis_pass, client, combined_content, category, market):
+    """
+    Run one analysis pass and return (result, elapsed seconds)
+    """
+    start = time.perf_counter()
+    result = analysis_pass(client, combined_content, category, market)
+    return result, time.perf_counter() - start
+
+def perform_cross_validation(client, combined_content, category, market):
     """
     Cross-validate information across multiple sources
     """
-    combined_content = "\n\n".join([
-        f"Source: {content['url']}\nDomain: {content['domain']}\nContent: {content['content']}" 
-        for content in source_content
-    ])
-    
     validation_prompt = f"""
     Analyze the following market intelligence from multiple sources and extract SPECIFIC QUANTITATIVE DATA:
     
@@ -92,7 +102,8 @@ def perform_cross_validation(client, source_content, category, market):
     }}
     """
     
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        client,
         model="gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
         messages=[
             {"role": "system", "content": "You are a market intelligence analyst specializing in cross-validation of information from multiple sources."},
@@ -103,15 +114,10 @@ def perform_cross_validation(client, source_content, category, market):
     
     return json.loads(response.choices[0].message.content)
 
-def perform_intelligence_synthesis(client, source_content, category, market):
+def perform_intelligence_synthesis(client, combined_content, category, market):
     """
     Synthesize intelligence to identify patterns and connections
     """
-    combined_content = "\n\n".join([
-        f"Source: {content['url']}\nContent: {content['content']}" 
-        for content in source_content
-    ])
-    
     synthesis_prompt = f"""
     Synthesize the following market intelligence and extract QUANTITATIVE DATA for strategic insights:
     
@@ -164,7 +170,8 @@ def perform_intelligence_synthesis(client, source_content, category, market):
     }}
     """
     
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        client,
         model="gpt-4o",
         messages=[
             {"role": "system", "content": "You are a strategic intelligence analyst specializing in market synthesis and pattern recognition."},
@@ -175,15 +182,10 @@ def perform_intelligence_synthesis(client, source_content, category, market):
     
     return json.loads(response.choices[0].message.content)
 
-def generate_actionable_intelligence(client, source_content, category, market):
+def generate_actionable_intelligence(client, combined_content, category, market):
     """
     Generate actionable intelligence for procurement decision-making
     """
-    combined_content = "\n\n".join([
-        f"Source: {content['url']}\nContent: {content['content']}" 
-        for content in source_content
-    ])
-    
     actionable_prompt = f"""
     Generate actionable intelligence for procurement decision-making with QUANTITATIVE DATA:
     
@@ -242,7 +244,8 @@ def generate_actionable_intelligence(client, source_content, category, market):
     }}
     """
     
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        client,
         model="gpt-4o",
         messages=[
             {"role": "system", "content": "You are a procurement intelligence specialist focused on generating actionable business intelligence."},
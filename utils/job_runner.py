@@ -0,0 +1,307 @@
+"""
+Job Runner - Background research jobs that outlive Streamlit reruns, with status and partial results on disk
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from utils.disk_cache import get_cache_dir, compress_json, decompress_json
+from utils.search_options import get_research_depth_config, format_time_filter
+from utils.research_pipeline import run_research_pipeline, generate_research_queries
+from utils.run_store import get_run_store
+
+# Research runs executed at once; further jobs wait in the queue
+JOB_WORKERS = int(os.getenv("RESEARCH_JOB_WORKERS", 2))
+
+# Minimum seconds between writes of a running job's partial results
+PARTIAL_PERSIST_SECONDS = 1.0
+
+# Share of the progress bar reached when each pipeline stage completes
+STAGE_PROGRESS = {'queries': 0.05, 'search': 0.3, 'scrape': 0.7, 'analysis': 1.0}
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Seconds between refreshes of the job panel while any job is active
+JOB_POLL_SECONDS = 2
+
+class JobCancelled(Exception):
+    pass
+
+class JobRunner:
+    """
+    Process-wide pool of research workers backed by a job table in SQLite.
+    
+    Jobs are accepted with submit() and run on worker threads, so a Streamlit rerun or
+    browser refresh neither blocks nor loses them. Each job's status, stage, progress
+    and partial results are written to the table as the run advances, and the final
+    intelligence data is saved to the run store, whose id the job records. Jobs left
+    queued or running by a previous process are queued again on start-up.
+    """
+    
+    def __init__(self, workers=JOB_WORKERS):
+        self.path = os.path.join(get_cache_dir(), "jobs.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                request BLOB NOT NULL,
+                stage TEXT,
+                progress REAL NOT NULL DEFAULT 0,
+                partial BLOB,
+                run_id TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at)")
+        self._conn.commit()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="research-job")
+        self._cancelled = set()
+        
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'queued', stage = NULL, progress = 0 WHERE status = 'running'")
+            self._conn.commit()
+            interrupted = [row[0] for row in self._conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at"
+            )]
+        for job_id in interrupted:
+            self._executor.submit(self._run, job_id)
+    
+    def submit(self, request):
+        """
+        Queue a research request and return its job id.
+        
+        request holds 'categories', 'market', 'timescale', 'research_depth' and 'user_input',
+        and 'incremental': True to refresh the last stored run for the same request
+        ('rebuild_after' bounds how long refreshes keep merging; see run_research_job).
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, request, created_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, compress_json(request), time.time())
+            )
+            self._conn.commit()
+        self._executor.submit(self._run, job_id)
+        return job_id
+    
+    def cancel(self, job_id):
+        """
+        Stop a queued or running job at its next progress event
+        """
+        with self._lock:
+            self._cancelled.add(job_id)
+            self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            self._conn.commit()
+    
+    def get(self, job_id):
+        """
+        Status record for a job: id, status, request, stage, progress, partial, run_id, error and timings
+        """
+        columns = "id, status, request, stage, progress, partial, run_id, error, created_at, started_at, finished_at"
+        with self._lock:
+            self._conn.row_factory = sqlite3.Row
+            try:
+                row = self._conn.execute(f"SELECT {columns} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            finally:
+                self._conn.row_factory = None
+        return self._job_record(row) if row else None
+    
+    def list_jobs(self, job_ids=None, limit=20):
+        """
+        Most recent jobs first, optionally restricted to the given ids
+        """
+        columns = "id, status, request, stage, progress, partial, run_id, error, created_at, started_at, finished_at"
+        query = f"SELECT {columns} FROM jobs"
+        params = []
+        if job_ids is not None:
+            if not job_ids:
+                return []
+            query += f" WHERE id IN ({', '.join('?' for _ in job_ids)})"
+            params.extend(job_ids)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        
+        with self._lock:
+            self._conn.row_factory = sqlite3.Row
+            try:
+                rows = self._conn.execute(query, params).fetchall()
+            finally:
+                self._conn.row_factory = None
+        return [self._job_record(row) for row in rows]
+    
+    def _job_record(self, row):
+        record = dict(row)
+        record['request'] = decompress_json(record['request'])
+        record['partial'] = decompress_json(record['partial']) if record['partial'] else {}
+        return record
+    
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+    
+    def _check_cancelled(self, job_id):
+        with self._lock:
+            if job_id in self._cancelled:
+                raise JobCancelled()
+    
+    def _run(self, job_id):
+        job = self.get(job_id)
+        if job is None or job['status'] != 'queued':
+            return
+        
+        try:
+            self._check_cancelled(job_id)
+            self._update(job_id, status='running', stage='queries', progress=0.0, started_at=time.time())
+            result = run_research_job(
+                job['request'],
+                on_progress=lambda stage, progress, partial: self._update(
+                    job_id, stage=stage, progress=progress, partial=compress_json(partial)
+                ),
+                should_stop=lambda: self._check_cancelled(job_id)
+            )
+            run_id = get_run_store().save(result)
+            self._update(
+                job_id, status='done', stage='complete', progress=1.0,
+                partial=None, run_id=run_id, finished_at=time.time()
+            )
+        except JobCancelled:
+            self._update(job_id, status='cancelled', finished_at=time.time())
+        except Exception as e:
+            print(f"Research job {job_id} failed: {e}")
+            self._update(job_id, status='failed', error=str(e), finished_at=time.time())
+        finally:
+            with self._lock:
+                self._cancelled.discard(job_id)
+
+def run_research_job(request, on_progress=None, should_stop=None):
+    """
+    Run one research request end to end outside Streamlit and return its intelligence data.
+    
+    on_progress(stage, progress, partial) is called at most every PARTIAL_PERSIST_SECONDS
+    (and at every stage change) with the queries, finished category analyses and the
+    streamed previews so far. should_stop() may raise to abandon the run between events.
+    
+    An incremental request refreshes the newest stored run with the same categories,
+    market, timescale and depth level, analyzing only sources that are new or changed
+    since then. Failing an exact match, the newest run at that depth whose categories
+    include these (say, an earlier multi-category run for a category queued on its own)
+    is the baseline; without either it runs in full. With 'rebuild_after' (seconds) set,
+    a baseline whose analysis was last built from scratch more than that long ago is
+    not merged into, and the run rebuilds the analysis in full. The baseline found, or None, is
+    recorded in intelligence_data['refresh_baseline'], and the time the analysis was last
+    built from scratch in intelligence_data['rebuilt_at'].
+    """
+    categories = request['categories']
+    market = request['market']
+    config = get_research_depth_config(request['research_depth'])
+    time_filter = format_time_filter(request['timescale'])
+    
+    previous_run = None
+    if request.get('incremental'):
+        store = get_run_store()
+        baseline = store.latest(categories, market, request['timescale'], research_depth=request['research_depth'])
+        if baseline is None:
+            baseline = store.latest_covering(categories, market, request['timescale'], research_depth=request['research_depth'])
+        previous_run = store.get(baseline['id']) if baseline else None
+        rebuild_after = request.get('rebuild_after')
+        if previous_run and rebuild_after is not None and time.time() - previous_run.get('rebuilt_at', baseline['created_at']) > rebuild_after:
+            # Merges keep earlier findings, so a long chain of refreshes is rebuilt from scratch
+            previous_run = None
+    
+    queries = generate_research_queries(categories, market, request['timescale'], request['research_depth'], config['num_queries'])
+    intelligence_data = {
+        'queries': queries,
+        'search_results': [],
+        'analysis': {},
+        'categories': categories,
+        'market': market,
+        'timescale': request['timescale'],
+        'research_depth': request['research_depth'],
+        'user_input': request.get('user_input', ''),
+        'config': config,
+        'rebuilt_at': previous_run.get('rebuilt_at', baseline['created_at']) if previous_run else time.time()
+    }
+    if request.get('incremental'):
+        intelligence_data['refresh_baseline'] = {
+            'run_id': baseline['id'],
+            'categories': baseline['categories'],
+            'research_depth': baseline['research_depth'],
+            'created_at': baseline['created_at'],
+            'rebuilt': previous_run is None
+        } if baseline else None
+    
+    partial = {
+        'queries': queries, 'searched': 0, 'scraped': 0, 'failed': 0,
+        'category_analyses': {}, 'previews': {}
+    }
+    stage = 'queries'
+    progress = STAGE_PROGRESS['queries']
+    last_persist = 0.0
+    
+    def report(force=False):
+        nonlocal last_persist
+        if on_progress and (force or time.perf_counter() - last_persist >= PARTIAL_PERSIST_SECONDS):
+            last_persist = time.perf_counter()
+            on_progress(stage, progress, partial)
+    
+    report(force=True)
+    pipeline = run_research_pipeline(queries, categories, market, config, time_filter, previous_run=previous_run)
+    try:
+        for event in pipeline:
+            if should_stop:
+                should_stop()
+            
+            previous_stage = stage
+            if event['type'] == 'search':
+                # Searches still finishing while pages are scraped must not move the job back a stage
+                if stage == 'queries':
+                    stage = 'search'
+                partial['searched'] = event['completed']
+                progress = max(progress, STAGE_PROGRESS['queries'] + (STAGE_PROGRESS['search'] - STAGE_PROGRESS['queries']) * event['completed'] / event['total'])
+            elif event['type'] == 'scrape':
+                stage = 'scrape'
+                partial['scraped' if event['record']['success'] else 'failed'] += 1
+                progress = max(progress, STAGE_PROGRESS['search'] + (STAGE_PROGRESS['scrape'] - STAGE_PROGRESS['search']) * min(1.0, event['finished'] / config['max_sources']))
+            elif event['type'] == 'analysis_start':
+                stage = 'analysis'
+                progress = STAGE_PROGRESS['scrape']
+            elif event['type'] == 'analysis_partial':
+                partial['previews'] = event['partials']
+            elif event['type'] == 'analysis':
+                partial['category_analyses'][event['category']] = event['result']
+                progress = STAGE_PROGRESS['scrape'] + (STAGE_PROGRESS['analysis'] - STAGE_PROGRESS['scrape']) * event['completed'] / event['total']
+            elif event['type'] == 'done':
+                intelligence_data.update(event['data'])
+            
+            report(force=stage != previous_stage or event['type'] == 'analysis')
+    finally:
+        pipeline.close()
+    
+    return intelligence_data
+
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+def get_job_runner():
+    """
+    Return the process-wide job runner, starting its workers on first use
+    """
+    global _job_runner
+    with _job_runner_lock:
+        if _job_runner is None:
+            _job_runner = JobRunner()
+        return _job_runner
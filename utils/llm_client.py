@@ -0,0 +1,266 @@
+"""
+LLM Client - Shared OpenAI client, rate-limit-aware retries and response cache for chat completions
+"""
+
+import os
+import json
+import hashlib
+import random
+import threading
+import time
+import httpx
+from openai import OpenAI, RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+from openai.types.chat import ChatCompletion
+from utils.disk_cache import DiskCache, hash_key
+
+# Retry policy for chat completions: exponential backoff with jitter, honouring Retry-After
+LLM_MAX_RETRIES = 4
+LLM_BACKOFF_BASE = 2.0
+LLM_BACKOFF_MAX = 30.0
+
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+# Connection pool and timeouts for the shared OpenAI client; sized for concurrent category and pass fan-out
+OPENAI_MAX_CONNECTIONS = 20
+OPENAI_KEEPALIVE_EXPIRY = 120  # seconds an idle connection is kept open
+OPENAI_CONNECT_TIMEOUT = 10
+OPENAI_READ_TIMEOUT = 180  # long JSON completions can take minutes
+
+_openai_clients = {}
+_openai_clients_lock = threading.Lock()
+
+def get_openai_client(api_key=None):
+    """
+    Return the process-wide OpenAI client for an API key (OPENAI_API_KEY by default).
+    
+    The client is thread-safe and keeps one pooled, keep-alive HTTP connection pool, so
+    concurrent analysis passes share TLS connections instead of opening new ones per call.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    with _openai_clients_lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            timeout = httpx.Timeout(OPENAI_READ_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+            http_client = httpx.Client(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+                )
+            )
+            client = OpenAI(api_key=api_key, timeout=timeout, max_retries=LLM_MAX_RETRIES, http_client=http_client)
+            _openai_clients[api_key] = client
+        return client
+
+# Response cache: identical prompts over the same corpus are answered from disk for a week
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = 2000
+
+# Request options that do not change the answer and are left out of the cache key
+UNCACHED_OPTIONS = ('timeout', 'extra_headers')
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+_llm_savings = {'saved_seconds': 0.0, 'saved_tokens': 0}
+
+def get_llm_cache():
+    """
+    Return the process-wide on-disk LLM response cache
+    """
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = DiskCache("llm_responses", max_entries=LLM_CACHE_MAX_ENTRIES)
+        return _llm_cache
+
+def get_llm_cache_stats():
+    """
+    Hit/miss counters for the LLM response cache, with the latency and tokens saved by hits in this process
+    """
+    stats = get_llm_cache().stats()
+    with _llm_cache_lock:
+        stats.update(_llm_savings)
+    return stats
+
+def llm_cache_enabled(use_cache=True):
+    """
+    Whether responses may be served from cache; LLM_CACHE_DISABLED=1 bypasses it everywhere
+    """
+    return use_cache and os.getenv("LLM_CACHE_DISABLED") != "1"
+
+def llm_cache_key(model, messages, response_format=None, **options):
+    """
+    Cache key built from the model, system prompt, a hash of the user prompt and the response format
+    """
+    system_prompt = "\n".join(str(m['content']) for m in messages if m['role'] == 'system')
+    user_messages = [m for m in messages if m['role'] != 'system']
+    user_prompt_hash = hashlib.sha256(json.dumps(user_messages, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    other_options = {key: value for key, value in options.items() if key not in UNCACHED_OPTIONS}
+    return hash_key(model, system_prompt, user_prompt_hash, response_format, other_options)
+
+def retry_delay(error, attempt):
+    """
+    Seconds to wait before retrying, preferring the server's Retry-After hint when one is given
+    """
+    response = getattr(error, 'response', None)
+    if response is not None:
+        try:
+            retry_after_ms = response.headers.get('retry-after-ms')
+            if retry_after_ms:
+                return min(LLM_BACKOFF_MAX, float(retry_after_ms) / 1000)
+            retry_after = response.headers.get('retry-after')
+            if retry_after:
+                return min(LLM_BACKOFF_MAX, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+    
+    backoff = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt))
+    return backoff / 2 + random.uniform(0, backoff / 2)
+
+def cached_completion(use_cache, kwargs):
+    """
+    Look a request up in the response cache.
+    
+    Returns (cache key, cached ChatCompletion); the key is None when caching is bypassed
+    and the response is None on a miss.
+    """
+    if not llm_cache_enabled(use_cache):
+        return None, None
+    
+    cache_key = llm_cache_key(**kwargs)
+    cached = get_llm_cache().get(cache_key)
+    if cached is None:
+        return cache_key, None
+    
+    response = ChatCompletion.model_validate(cached['response'])
+    with _llm_cache_lock:
+        _llm_savings['saved_seconds'] += cached['latency']
+        _llm_savings['saved_tokens'] += response.usage.total_tokens if response.usage else 0
+    return cache_key, response
+
+def store_completion(cache_key, response, latency):
+    """
+    Cache a fresh response with the latency it took, when caching is enabled for the request.
+    
+    Only complete answers are cached: a reply cut off at max_tokens or by the content
+    filter would otherwise be replayed for every identical prompt.
+    """
+    if cache_key and all(choice.finish_reason == 'stop' for choice in response.choices):
+        get_llm_cache().set(
+            cache_key,
+            {'response': response.model_dump(mode='json'), 'latency': latency},
+            LLM_CACHE_TTL
+        )
+
+def create_chat_completion(client, max_retries=LLM_MAX_RETRIES, use_cache=True, **kwargs):
+    """
+    Call client.chat.completions.create, retrying rate limits, timeouts and server errors.
+    
+    The client's own retries are disabled for the call so this policy is the only one
+    applied. Complete responses are cached on disk and identical requests are answered
+    from the cache; pass use_cache=False or set LLM_CACHE_DISABLED=1 to bypass it.
+    """
+    cache_key, cached = cached_completion(use_cache, kwargs)
+    if cached is not None:
+        return cached
+    
+    start = time.perf_counter()
+    response = request_with_retries(client, max_retries, **kwargs)
+    store_completion(cache_key, response, time.perf_counter() - start)
+    
+    return response
+
+def stream_chat_completion(client, on_delta=None, max_retries=LLM_MAX_RETRIES, use_cache=True, **kwargs):
+    """
+    Streaming variant of create_chat_completion that calls on_delta(text) as content arrives.
+    
+    Returns the assembled ChatCompletion once the stream ends, and caches it like a
+    blocking call. A cache hit is delivered to on_delta as a single delta. Transient
+    failures are retried only before the first delta, so a caller never sees text twice.
+    """
+    cache_key, cached = cached_completion(use_cache, kwargs)
+    if cached is not None:
+        content = cached.choices[0].message.content
+        if on_delta and content:
+            on_delta(content)
+        return cached
+    
+    start = time.perf_counter()
+    response = stream_with_retries(client, on_delta, max_retries, **kwargs)
+    store_completion(cache_key, response, time.perf_counter() - start)
+    
+    return response
+
+def request_with_retries(client, max_retries=LLM_MAX_RETRIES, **kwargs):
+    """
+    Issue one chat completion, retrying transient failures with backoff
+    """
+    client = client.with_options(max_retries=0)
+    
+    for attempt in range(max_retries + 1):
+        try:
+            return client.chat.completions.create(**kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = retry_delay(e, attempt)
+            print(f"OpenAI request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def stream_with_retries(client, on_delta=None, max_retries=LLM_MAX_RETRIES, **kwargs):
+    """
+    Stream one chat completion and assemble it, retrying transient failures before any text arrives
+    """
+    client = client.with_options(max_retries=0)
+    delivered = []
+    
+    def deliver(text):
+        delivered.append(text)
+        if on_delta:
+            on_delta(text)
+    
+    for attempt in range(max_retries + 1):
+        try:
+            stream = client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **kwargs)
+            return collect_stream(stream, deliver)
+        except RETRYABLE_ERRORS as e:
+            if delivered or attempt == max_retries:
+                raise
+            delay = retry_delay(e, attempt)
+            print(f"OpenAI stream failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def collect_stream(stream, on_delta):
+    """
+    Read a chat completion stream to the end, passing each content delta on, and build the ChatCompletion
+    """
+    parts = []
+    completion = {'id': '', 'model': '', 'created': 0, 'finish_reason': 'stop', 'usage': None}
+    
+    with stream:
+        for chunk in stream:
+            completion['id'] = chunk.id or completion['id']
+            completion['model'] = chunk.model or completion['model']
+            completion['created'] = chunk.created or completion['created']
+            if chunk.usage:
+                completion['usage'] = chunk.usage.model_dump(mode='json')
+            for choice in chunk.choices:
+                if choice.delta and choice.delta.content:
+                    parts.append(choice.delta.content)
+                    on_delta(choice.delta.content)
+                if choice.finish_reason:
+                    completion['finish_reason'] = choice.finish_reason
+    
+    return ChatCompletion.model_validate({
+        'id': completion['id'],
+        'object': 'chat.completion',
+        'created': completion['created'],
+        'model': completion['model'],
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': "".join(parts)},
+            'finish_reason': completion['finish_reason']
+        }],
+        'usage': completion['usage']
+    })
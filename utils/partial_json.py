@@ -0,0 +1,77 @@
+"""
+Partial JSON - Parse the completed part of a JSON document while it is still streaming
+"""
+
+import json
+
+CLOSERS = {'{': '}', '[': ']'}
+
+class PartialJSONParser:
+    """
+    Incremental parser for a streamed JSON object.
+    
+    Text is scanned once as it is fed. The parser remembers the last position where
+    every value so far was complete (just before a separating comma or just after a
+    closing bracket) together with the containers still open there, so a snapshot is
+    that prefix with the open containers closed. Values still being written, such as a
+    half-finished string, are left out until they complete.
+    """
+    
+    def __init__(self):
+        self.text = ""
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._cut = 0
+        self._cut_closers = ""
+        self._snapshot_cut = None
+        self._snapshot = {}
+    
+    def feed(self, delta):
+        """
+        Add streamed text; returns True when more of the document has completed
+        """
+        start = len(self.text)
+        self.text += delta
+        cut_before = self._cut
+        
+        for position in range(start, len(self.text)):
+            char = self.text[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in CLOSERS:
+                self._stack.append(CLOSERS[char])
+            elif char in '}]':
+                if self._stack:
+                    self._stack.pop()
+                self._mark_cut(position + 1)
+            elif char == ',':
+                self._mark_cut(position)
+        
+        return self._cut != cut_before
+    
+    def _mark_cut(self, position):
+        self._cut = position
+        self._cut_closers = "".join(reversed(self._stack))
+    
+    def snapshot(self):
+        """
+        The completed part of the document as a dict ({} before anything has completed)
+        """
+        if self._cut != self._snapshot_cut:
+            try:
+                value = json.loads(self.text[:self._cut] + self._cut_closers)
+            except ValueError:
+                # Keep the previous snapshot; the next completed value will move the cut point
+                value = None
+            if isinstance(value, dict):
+                self._snapshot = value
+            self._snapshot_cut = self._cut
+        return self._snapshot
@@ -1,16 +1,19 @@
-import os
 import base64
-from openai import OpenAI
+from utils.llm_client import create_chat_completion, get_openai_client
+from utils.context_packer import pack_sources, format_packed_sources
 import json
 from PIL import Image
 import io
 
+# Prompt tokens given to scraped source passages when filling a template
+TEMPLATE_CONTEXT_TOKENS = 16000
+
 def analyze_image_and_query(image_file, user_query, market="UK"):
     """
     Analyze uploaded image and combine with user query to generate personalized search queries
     """
     try:
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = get_openai_client()
         
         # Convert image to base64
         image_base64 = encode_image_to_base64(image_file)
@@ -60,7 +63,8 @@ def analyze_image_and_query(image_file, user_query, market="UK"):
         }}
         """
         
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            client,
             model="gpt-4o",
             messages=[
                 {
@@ -93,7 +97,13 @@ def generate_personalized_template(template_data, analysis_results, user_query):
     Generate a personalized template/report based on user requirements and analysis results
     """
     try:
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = get_openai_client()
+        
+        # Replace the raw page text with the passages most relevant to the user's query
+        packed_sources, source_tokens = pack_sources(
+            analysis_results.get('scraped_content', []), TEMPLATE_CONTEXT_TOKENS, query=user_query
+        )
+        analysis_results = dict(analysis_results, scraped_content=format_packed_sources(packed_sources))
         
         prompt = f"""
         Create a personalized market intelligence report that fills the structure identified in the uploaded image.
@@ -153,7 +163,8 @@ def generate_personalized_template(template_data, analysis_results, user_query):
         }}
         """
         
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            client,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are a market intelligence specialist creating personalized reports."},
@@ -162,7 +173,9 @@ def generate_personalized_template(template_data, analysis_results, user_query):
             response_format={"type": "json_object"}
         )
         
-        return json.loads(response.choices[0].message.content)
+        report = json.loads(response.choices[0].message.content)
+        report['source_tokens'] = source_tokens
+        return report
         
     except Exception as e:
         print(f"Template generation error: {str(e)}")  # Debug print
@@ -198,7 +211,7 @@ def create_visual_report(report_data, format_type="professional"):
     Create a visual report based on the generated template
     """
     try:
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = get_openai_client()
         
         # Generate visual elements description
         prompt = f"""
@@ -231,7 +244,8 @@ def create_visual_report(report_data, format_type="professional"):
         }}
         """
         
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            client,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are a design specialist for business intelligence reports."},
@@ -0,0 +1,151 @@
+"""
+Pre-warm - Off-hours research runs for the common category/market pairs, kept fresh in the run store
+
+Each pre-warmed key is one common category (CATEGORY_SHORT_NAMES) in one market at the
+default time scope. Keys whose newest stored run is younger than the freshness window
+are skipped; stale keys are refreshed incrementally when a previous run exists, so a
+daily pass mostly revalidates pages and merges new sources. Merging keeps earlier
+findings, so each key's analysis is rebuilt from scratch every PREWARM_REBUILD_DAYS,
+or sooner when its time scope is shorter. Interactive requests for a fresh key are
+then loaded straight from the run store.
+
+Usage:
+    python -m utils.prewarm [--markets UK,EU] [--timescale "Last 6 months"] [--schedule]
+"""
+
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from utils.categories import CATEGORY_SHORT_NAMES
+from utils.job_runner import run_research_job
+from utils.run_store import get_run_store
+from utils.search_options import timescale_days
+
+PREWARM_MARKETS = [market.strip() for market in os.getenv("PREWARM_MARKETS", "UK").split(",") if market.strip()]
+PREWARM_TIMESCALE = os.getenv("PREWARM_TIMESCALE", "Last 6 months")
+PREWARM_DEPTH = os.getenv("PREWARM_DEPTH", "Medium (10 queries)")
+PREWARM_HOUR = int(os.getenv("PREWARM_HOUR", 2))  # local hour the daily pass starts, off-hours by default
+
+# A stored run younger than this is served as-is instead of starting new research
+FRESH_RUN_SECONDS = int(os.getenv("PREWARM_MAX_AGE", 24 * 3600))
+
+# Days incremental refreshes may keep merging into an analysis before it is rebuilt in full
+PREWARM_REBUILD_DAYS = float(os.getenv("PREWARM_REBUILD_DAYS", 7))
+
+def prewarm_keys(markets=None, timescale=None):
+    """
+    (category, market, timescale) for every common category in every pre-warmed market
+    """
+    return [
+        (category, market, timescale or PREWARM_TIMESCALE)
+        for market in (markets or PREWARM_MARKETS)
+        for category in CATEGORY_SHORT_NAMES
+    ]
+
+def find_fresh_run(categories, market, timescale, research_depth, max_age=FRESH_RUN_SECONDS):
+    """
+    Summary of a stored run for this request, at research_depth or deeper, young enough to serve without new research, or None
+    """
+    return get_run_store().latest(categories, market, timescale, max_age=max_age, research_depth=research_depth, at_least=True)
+
+def rebuild_seconds(timescale):
+    """
+    Seconds a pre-warmed analysis may be refreshed incrementally before a full rebuild
+    """
+    return min(PREWARM_REBUILD_DAYS, timescale_days(timescale)) * 86400
+
+def prewarm(keys=None, research_depth=PREWARM_DEPTH, max_age=FRESH_RUN_SECONDS, should_stop=None):
+    """
+    Run research for every key without a fresh stored run, one key at a time.
+    
+    Returns counts of keys 'fresh' (skipped), 'refreshed', 'failed', and the total 'seconds'.
+    should_stop() returning True ends the pass before the next key.
+    """
+    start = time.perf_counter()
+    stats = {'fresh': 0, 'refreshed': 0, 'failed': 0}
+    
+    for category, market, timescale in keys or prewarm_keys():
+        if should_stop and should_stop():
+            break
+        if find_fresh_run([category], market, timescale, research_depth, max_age):
+            stats['fresh'] += 1
+            continue
+        
+        try:
+            intelligence_data = run_research_job({
+                'categories': [category],
+                'market': market,
+                'timescale': timescale,
+                'research_depth': research_depth,
+                'user_input': '',
+                'incremental': True,
+                'rebuild_after': rebuild_seconds(timescale)
+            })
+            get_run_store().save(intelligence_data)
+            stats['refreshed'] += 1
+            print(f"Pre-warmed {CATEGORY_SHORT_NAMES.get(category, category)} / {market} / {timescale}")
+        except Exception as e:
+            stats['failed'] += 1
+            print(f"Pre-warm failed for {category} / {market} / {timescale}: {e}")
+    
+    stats['seconds'] = round(time.perf_counter() - start, 1)
+    return stats
+
+def seconds_until_hour(hour, now=None):
+    """
+    Seconds from now until the next time the local clock reads hour:00
+    """
+    now = now or datetime.now()
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+def run_schedule(stop_event, hour=PREWARM_HOUR, keys=None, research_depth=PREWARM_DEPTH, max_age=FRESH_RUN_SECONDS):
+    """
+    Run a pre-warm pass every day at hour until stop_event is set
+    """
+    while not stop_event.wait(seconds_until_hour(hour)):
+        stats = prewarm(keys, research_depth, max_age, should_stop=stop_event.is_set)
+        print(f"Pre-warm pass: {stats}")
+
+_scheduler_thread = None
+_scheduler_stop = threading.Event()
+_scheduler_lock = threading.Lock()
+
+def start_prewarm_scheduler(hour=PREWARM_HOUR):
+    """
+    Start the daily pre-warm pass on a daemon thread, once per process; PREWARM_DISABLED=1 turns it off
+    """
+    global _scheduler_thread
+    if os.getenv("PREWARM_DISABLED") == "1":
+        return None
+    with _scheduler_lock:
+        if _scheduler_thread is None:
+            _scheduler_thread = threading.Thread(
+                target=run_schedule, args=(_scheduler_stop, hour), name="prewarm-scheduler", daemon=True
+            )
+            _scheduler_thread.start()
+        return _scheduler_thread
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--markets", default=",".join(PREWARM_MARKETS), help="comma-separated markets to pre-warm")
+    parser.add_argument("--timescale", default=PREWARM_TIMESCALE, help="time scope of the pre-warmed runs")
+    parser.add_argument("--depth", default=PREWARM_DEPTH, help="research depth of the pre-warmed runs")
+    parser.add_argument("--max-age-hours", type=float, default=FRESH_RUN_SECONDS / 3600, help="keys with a run younger than this are skipped")
+    parser.add_argument("--schedule", action="store_true", help=f"keep running and pre-warm daily at PREWARM_HOUR ({PREWARM_HOUR}:00)")
+    args = parser.parse_args()
+    
+    keys = prewarm_keys([market.strip() for market in args.markets.split(",") if market.strip()], args.timescale)
+    if args.schedule:
+        print(f"Pre-warming {len(keys)} keys daily at {PREWARM_HOUR}:00")
+        run_schedule(threading.Event(), keys=keys, research_depth=args.depth, max_age=args.max_age_hours * 3600)
+    else:
+        stats = prewarm(keys, args.depth, max_age=args.max_age_hours * 3600)
+        print(f"{stats['refreshed']} refreshed, {stats['fresh']} already fresh, {stats['failed']} failed in {stats['seconds']}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Rate Limiting - Per-host token buckets so scraping stays polite without idling between hosts
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Sustained requests per second allowed to any one host, and how many may go out back to back
+HOST_REQUESTS_PER_SECOND = 1.0
+HOST_BURST = 2
+
+def host_for_url(url):
+    """
+    Host name used to group requests into buckets
+    """
+    try:
+        return (urlsplit(url).hostname or url).lower()
+    except ValueError:
+        return url.lower()
+
+def interleave_by_host(urls):
+    """
+    Reorder URLs round-robin across hosts so workers are not all parked waiting on one busy domain
+    """
+    by_host = {}
+    for url in urls:
+        by_host.setdefault(host_for_url(url), []).append(url)
+    
+    interleaved = []
+    queues = list(by_host.values())
+    while queues:
+        interleaved.extend(queue.pop(0) for queue in queues)
+        queues = [queue for queue in queues if queue]
+    return interleaved
+
+class HostRateLimiter:
+    """
+    Token-bucket scheduler keyed by host.
+    
+    Each host refills at `rate` tokens per second up to `burst`. reserve() claims a
+    token immediately and returns how long the caller must wait before using it, so
+    reservations queue up fairly and requests to different hosts never wait on each other.
+    """
+    
+    def __init__(self, rate=HOST_REQUESTS_PER_SECOND, burst=HOST_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+    
+    def reserve(self, url):
+        """
+        Claim the next request slot for the URL's host and return the delay in seconds before it may be sent
+        """
+        host = host_for_url(url)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            tokens -= 1
+            self._buckets[host] = (tokens, now)
+        return 0.0 if tokens >= 0 else -tokens / self.rate
+    
+    def acquire(self, url):
+        """
+        Block until a request to the URL's host is allowed
+        """
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+_host_rate_limiter = HostRateLimiter()
+
+def get_host_rate_limiter():
+    """
+    Return the process-wide per-host limiter, shared by every concurrent scrape
+    """
+    return _host_rate_limiter
@@ -0,0 +1,453 @@
+"""
+Research Pipeline - Overlapped search, scrape, fact extraction and analysis stages
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils.search_google import search_google, get_search_cache_stats
+from utils.search_index import SearchResultIndex
+from utils.scrape_url import iter_scrape_urls
+from utils.url_utils import canonicalize_url
+from utils.dedup import deduplicate_sources, minhash_sketch, estimate_similarity, NEAR_DUPLICATE_THRESHOLD
+from utils.source_facts import document_facts, extract_source_facts
+from utils.category_specific_analysis import analyze_category_specific_data
+from utils.llm_client import get_openai_client, get_llm_cache_stats
+from utils.intelligent_query import generate_intelligent_queries
+from utils.run_store import content_hash
+
+POLL_SECONDS = 0.1  # how long the pipeline waits for any stage before sampling metrics again
+PARTIAL_EVENT_SECONDS = 0.5  # minimum interval between streamed-analysis preview events
+
+# Cache counters are process-wide, so a run's cache stats include the lookups of any run overlapping it
+_pipeline_runs = {'active': 0, 'started': 0}
+_pipeline_runs_lock = threading.Lock()
+
+class StageMetrics:
+    """
+    Utilization and queue depth for one pipeline stage, sampled while the stage is active.
+    
+    Each sample records how many items are in flight: up to `workers` of them count as
+    busy workers, the rest as queued. Utilization is the mean busy fraction between the
+    first item entering the stage and the last one leaving it.
+    """
+    
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = max(1, workers)
+        self.items = 0
+        self.started = None
+        self.finished = None
+        self._busy_samples = []
+        self._queue_samples = []
+    
+    def sample(self, in_flight):
+        if in_flight > 0 and self.started is None:
+            self.started = time.perf_counter()
+        if self.started is None or self.finished is not None:
+            return
+        self._busy_samples.append(min(in_flight, self.workers) / self.workers)
+        self._queue_samples.append(max(0, in_flight - self.workers))
+    
+    def finish(self):
+        if self.finished is None:
+            self.finished = time.perf_counter()
+            if self.started is None:
+                self.started = self.finished
+    
+    def summary(self, pipeline_start):
+        samples = len(self._busy_samples)
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'start_seconds': round((self.started or pipeline_start) - pipeline_start, 2),
+            'wall_seconds': round((self.finished or time.perf_counter()) - (self.started or pipeline_start), 2),
+            'utilization': round(sum(self._busy_samples) / samples, 3) if samples else 0.0,
+            'avg_queue_depth': round(sum(self._queue_samples) / samples, 2) if samples else 0.0,
+            'max_queue_depth': max(self._queue_samples, default=0)
+        }
+
+def generate_research_queries(categories, market, timescale, research_depth, num_queries):
+    """
+    Intelligent queries for every category, tagged with their category and capped at num_queries
+    """
+    all_queries = []
+    for category in categories:
+        category_queries = generate_intelligent_queries(
+            category=category,
+            market=market,
+            time_focus=timescale,
+            research_depth=research_depth
+        )
+        for query in category_queries:
+            query['category'] = category
+        all_queries.extend(category_queries)
+    
+    return all_queries[:num_queries]
+
+def source_changed(record, previous_record):
+    """
+    Whether a scraped page is new since the previous run or its text differs from the copy analyzed then
+    """
+    if previous_record is None:
+        return True
+    if previous_record.get('content_hash'):
+        # Stored runs keep trimmed text, so compare against the hash of the full text
+        return content_hash(record['content']) != previous_record['content_hash']
+    return record['content'] != previous_record.get('content')
+
+def run_research_pipeline(queries, categories, market, config, time_filter=None, previous_run=None):
+    """
+    Run search, scrape, fact extraction and category analysis as overlapping stages.
+    
+    A generator of progress events for the caller to render between steps; every
+    event is a dict with a 'type':
+    
+    - 'search': one query finished ('index', 'results', 'new_urls', 'completed', 'total')
+    - 'scrape': one page finished ('record', 'finished', 'released')
+    - 'analysis_start': scraping and deduplication are done ('sources')
+    - 'analysis_partial': streamed analyses so far ('partials', 'results')
+    - 'analysis': one category finished ('category', 'result', 'completed', 'total')
+    - 'done': 'data' holds the intelligence_data fields this run produced
+    
+    URLs are released to the scraper in query order as soon as every earlier query has
+    returned, so the pages scraped are the same first config['max_sources'] unique
+    results a sequential run would pick. With several categories, fact sheets are shared
+    by all of them, so each page's sheet is extracted as soon as it is scraped; a single
+    category uses fact sheets only once at least map_reduce_threshold unique sources
+    survive deduplication, so its sheets are extracted after scraping, and only then.
+    Stage utilization and queue depths are reported in data['pipeline_metrics'].
+    
+    data['search_cache_stats'] and data['llm_cache_stats'] are the change in this
+    process's cache counters over the run; data['cache_stats_shared'] is True when
+    another pipeline ran at the same time and its lookups are counted too.
+    
+    With previous_run (stored intelligence data for the same request, or for a run whose
+    categories include these) the run is an incremental refresh: pages the previous run
+    already analyzed are still revalidated, which the page cache turns into conditional
+    requests, but only new or changed sources get fact sheets and analysis. Each
+    category's new findings are merged into its previous analysis, and categories with
+    nothing new keep it unchanged. A known page that fails to revalidate keeps its
+    previous text. The diff is reported in data['refresh_report'].
+    """
+    pipeline_start = time.perf_counter()
+    query_texts = [query['query'] for query in queries]
+    search_index = SearchResultIndex(query_texts)
+    search_cache_before = get_search_cache_stats()
+    llm_stats_before = get_llm_cache_stats()
+    
+    threshold = config['map_reduce_threshold']
+    previous_records = {}
+    previous_analyses = {}
+    if previous_run:
+        previous_records = {canonicalize_url(record['url']): record for record in previous_run.get('scraped_content', [])}
+        previous_analyses = {
+            category: analysis for category, analysis in previous_run.get('category_analyses', {}).items()
+            if 'error' not in analysis
+        }
+    extract_facts_early = threshold is not None and len(categories) > 1
+    
+    metrics = {
+        'search': StageMetrics('search', min(config['search_concurrency'], max(1, len(queries)))),
+        'scrape': StageMetrics('scrape', config['max_workers']),
+        'facts': StageMetrics('facts', config['map_concurrency']),
+        'analysis': StageMetrics('analysis', min(config['analysis_concurrency'], max(1, len(categories))))
+    }
+    
+    search_executor = ThreadPoolExecutor(max_workers=metrics['search'].workers, thread_name_prefix="pipeline-search")
+    facts_executor = ThreadPoolExecutor(max_workers=metrics['facts'].workers, thread_name_prefix="pipeline-facts")
+    # Shut down without waiting in finally, so a caller that stops consuming events is not held by in-flight LLM calls
+    analysis_executor = ThreadPoolExecutor(max_workers=metrics['analysis'].workers, thread_name_prefix="pipeline-analysis")
+    url_feed = queue.Queue()
+    scrape_records = queue.Queue()
+    scrape_done = object()
+    feed_closed = False
+    
+    def close_feed():
+        nonlocal feed_closed
+        if not feed_closed:
+            url_feed.put(None)
+            feed_closed = True
+    
+    def run_scraper():
+        try:
+            for record in iter_scrape_urls(
+                url_feed,
+                max_workers=config['max_workers'],
+                extract_workers=config['extract_workers'],
+                extract_queue_size=config['extract_queue_size'],
+                # The scraper starts with the first search, so its budget also covers the search window
+                time_budget=config['scrape_budget'] + config['search_timeout']
+            ):
+                scrape_records.put(record)
+        except Exception as e:
+            scrape_records.put(e)
+        finally:
+            scrape_records.put(scrape_done)
+    
+    with _pipeline_runs_lock:
+        cache_stats_shared = _pipeline_runs['active'] > 0
+        _pipeline_runs['active'] += 1
+        _pipeline_runs['started'] += 1
+        run_number = _pipeline_runs['started']
+    
+    try:
+        # Stage 1: searches, releasing unique URLs to the scraper in query order
+        search_futures = {
+            search_executor.submit(
+                search_google, query_text, config['num_results'], time_filter, True, config['search_timeout']
+            ): i
+            for i, query_text in enumerate(query_texts)
+        }
+        pending_searches = set(search_futures)
+        results_by_query = {}
+        next_release = 0
+        released_urls = set()
+        urls_released = 0
+        
+        # Stage 2: scraping, fed by the URL queue
+        threading.Thread(target=run_scraper, name="pipeline-scrape", daemon=True).start()
+        scraped_content = []
+        scrape_failures = []
+        scrape_finished = False
+        unchanged_urls = set()
+        
+        # Stage 3: fact sheets, submitted per page unless it repeats a page already submitted
+        facts_futures = {}
+        facts_by_url = {}
+        facts_stats = {'documents': 0, 'cached': 0, 'extracted': 0, 'failed': 0}
+        submitted_sketches = []
+        client = get_openai_client() if extract_facts_early else None
+        
+        if not queries:
+            close_feed()
+        
+        while pending_searches or not scrape_finished or facts_futures:
+            if pending_searches:
+                done, pending_searches = wait(pending_searches, timeout=0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = search_futures[future]
+                    results = future.result()
+                    results_by_query[i] = results
+                    new_urls = search_index.add(i, results)
+                    metrics['search'].items += 1
+                    yield {
+                        'type': 'search', 'index': i, 'results': results, 'new_urls': new_urls,
+                        'completed': len(results_by_query), 'total': len(queries)
+                    }
+                
+                while next_release in results_by_query and not feed_closed:
+                    for result in results_by_query[next_release]:
+                        canonical_url = canonicalize_url(result.get('link', ''))
+                        if canonical_url in released_urls or urls_released >= config['max_sources']:
+                            continue
+                        released_urls.add(canonical_url)
+                        url_feed.put(result['link'])
+                        urls_released += 1
+                    next_release += 1
+                    if next_release == len(queries) or urls_released >= config['max_sources']:
+                        close_feed()
+                
+                if not pending_searches:
+                    metrics['search'].finish()
+            
+            if not scrape_finished:
+                try:
+                    record = scrape_records.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    record = None
+                
+                if record is scrape_done:
+                    scrape_finished = True
+                    metrics['scrape'].finish()
+                elif isinstance(record, Exception):
+                    raise record
+                elif record is not None:
+                    metrics['scrape'].items += 1
+                    previous_record = previous_records.get(canonicalize_url(record['url']))
+                    if not (record['success'] and record['content']) and previous_record:
+                        record = previous_record
+                    
+                    if record['success'] and record['content']:
+                        scraped_content.append(record)
+                        # A carried-forward record holds trimmed text, which would never match its full-text hash
+                        fresh = record is not previous_record and source_changed(record, previous_record)
+                        if not fresh:
+                            unchanged_urls.add(record['url'])
+                        if extract_facts_early:
+                            sketch = minhash_sketch(record['content'])
+                            if not any(estimate_similarity(sketch, other) >= NEAR_DUPLICATE_THRESHOLD for other in submitted_sketches):
+                                submitted_sketches.append(sketch)
+                                if fresh:
+                                    facts_futures[facts_executor.submit(document_facts, client, record)] = record['url']
+                    else:
+                        scrape_failures.append(record)
+                    yield {
+                        'type': 'scrape', 'record': record,
+                        'finished': len(scraped_content) + len(scrape_failures), 'released': urls_released
+                    }
+            else:
+                wait(list(facts_futures) + list(pending_searches), timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+            
+            for future in [future for future in facts_futures if future.done()]:
+                url = facts_futures.pop(future)
+                facts_stats['documents'] += 1
+                metrics['facts'].items += 1
+                try:
+                    facts, cached = future.result()
+                except Exception as e:
+                    print(f"Fact extraction failed for {url}: {e}")
+                    facts_stats['failed'] += 1
+                    continue
+                facts_stats['cached' if cached else 'extracted'] += 1
+                if facts:
+                    facts_by_url[url] = facts
+            
+            metrics['search'].sample(len(pending_searches))
+            metrics['scrape'].sample(0 if scrape_finished else urls_released - len(scraped_content) - len(scrape_failures))
+            metrics['facts'].sample(len(facts_futures))
+        
+        if extract_facts_early:
+            metrics['facts'].finish()
+        
+        # Collapse syndicated copies so each text is analyzed once, attributed to all its URLs
+        analysis_sources, dedup_report = deduplicate_sources(scraped_content)
+        
+        if previous_run:
+            # Only texts the previous run has not seen are analyzed; a copy of a known page adds nothing new
+            all_sources = analysis_sources
+            analysis_sources = [
+                source for source in all_sources
+                if not unchanged_urls.intersection([source['url']] + source['duplicate_urls'])
+            ]
+            refresh_report = {
+                'previous_sources': len(previous_records),
+                'unchanged_urls': len(unchanged_urls),
+                'new_urls': sum(1 for record in scraped_content if canonicalize_url(record['url']) not in previous_records),
+                'changed_urls': sum(1 for record in scraped_content if canonicalize_url(record['url']) in previous_records and record['url'] not in unchanged_urls),
+                'analyzed_sources': len(analysis_sources),
+                'reused_categories': [],
+                'merged_categories': [],
+                'full_categories': []
+            }
+        
+        source_facts = None
+        facts_extracted = extract_facts_early
+        if extract_facts_early:
+            # A representative shares its cluster's text, so any member's fact sheet stands for it
+            source_facts = []
+            for source in analysis_sources:
+                for url in [source['url']] + source['duplicate_urls']:
+                    if url in facts_by_url:
+                        source_facts.append({'url': source['url'], 'duplicate_urls': source['duplicate_urls'], 'facts': facts_by_url[url]})
+                        break
+        elif threshold is not None and len(analysis_sources) >= threshold:
+            # A single category switches to fact sheets only now that the unique source count is known
+            metrics['facts'].sample(len(analysis_sources))
+            source_facts, facts_stats = extract_source_facts(analysis_sources, concurrency=config['map_concurrency'], client=get_openai_client())
+            metrics['facts'].items = facts_stats['documents']
+            metrics['facts'].finish()
+            facts_extracted = True
+        
+        # Stage 4: category analyses, streamed so previews can render while they generate
+        category_analyses = {}
+        results_by_category = {}
+        category_requests = {}
+        for category in categories:
+            if not previous_run:
+                category_requests[category] = (analysis_sources, {'source_facts': source_facts})
+            elif category not in previous_analyses:
+                # Nothing to merge into, so this category is analyzed over every source (fact sheets come from cache)
+                category_requests[category] = (all_sources, {'map_reduce_threshold': threshold, 'map_concurrency': config['map_concurrency']})
+                refresh_report['full_categories'].append(category)
+            elif analysis_sources:
+                category_requests[category] = (analysis_sources, {'source_facts': source_facts, 'previous_analysis': previous_analyses[category]})
+                refresh_report['merged_categories'].append(category)
+            else:
+                results_by_category[category] = previous_analyses[category]
+                refresh_report['reused_categories'].append(category)
+        
+        yield {'type': 'analysis_start', 'sources': len(all_sources if previous_run else analysis_sources)}
+        
+        for category in list(results_by_category):
+            yield {
+                'type': 'analysis', 'category': category, 'result': results_by_category[category],
+                'completed': len(results_by_category), 'total': len(categories)
+            }
+        
+        category_requests = {category: request for category, request in category_requests.items() if request[0]}
+        if category_requests:
+            partial_analyses = {}
+            future_to_category = {
+                analysis_executor.submit(
+                    analyze_category_specific_data, category, market, sources,
+                    on_partial=lambda partial, category=category: partial_analyses.__setitem__(category, partial),
+                    **options
+                ): category
+                for category, (sources, options) in category_requests.items()
+            }
+            
+            pending = set(future_to_category)
+            last_partial_event = 0.0
+            while pending:
+                metrics['analysis'].sample(len(pending))
+                done, pending = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    category = future_to_category[future]
+                    results_by_category[category] = future.result()
+                    metrics['analysis'].items += 1
+                    yield {
+                        'type': 'analysis', 'category': category, 'result': results_by_category[category],
+                        'completed': len(results_by_category), 'total': len(categories)
+                    }
+                
+                if time.perf_counter() - last_partial_event >= PARTIAL_EVENT_SECONDS:
+                    last_partial_event = time.perf_counter()
+                    yield {'type': 'analysis_partial', 'partials': dict(partial_analyses), 'results': dict(results_by_category)}
+        
+        category_analyses = {category: results_by_category[category] for category in categories if category in results_by_category}
+        metrics['analysis'].finish()
+        
+        search_cache_after = get_search_cache_stats()
+        llm_stats_after = get_llm_cache_stats()
+        with _pipeline_runs_lock:
+            cache_stats_shared = cache_stats_shared or _pipeline_runs['started'] > run_number
+        
+        data = {
+            'search_results': search_index.unique_results(),
+            'search_index_stats': search_index.stats(),
+            'search_cache_stats': {
+                'hits': search_cache_after['hits'] - search_cache_before['hits'],
+                'misses': search_cache_after['misses'] - search_cache_before['misses'],
+                'entries': search_cache_after['entries']
+            },
+            'scraped_content': scraped_content,
+            'scrape_failures': scrape_failures,
+            'dedup_report': dedup_report,
+            'category_analyses': category_analyses,
+            'analysis': category_analyses[categories[0]] if category_analyses and categories else {},
+            'llm_cache_stats': {
+                key: llm_stats_after[key] - llm_stats_before[key]
+                for key in ('hits', 'misses', 'saved_seconds', 'saved_tokens')
+            },
+            'cache_stats_shared': cache_stats_shared,
+            'pipeline_metrics': {
+                'total_seconds': round(time.perf_counter() - pipeline_start, 2),
+                'stages': {name: stage.summary(pipeline_start) for name, stage in metrics.items()}
+            }
+        }
+        if facts_extracted:
+            data['source_facts_stats'] = facts_stats
+        if previous_run:
+            data['refresh_report'] = refresh_report
+        
+        yield {'type': 'done', 'data': data}
+    
+    finally:
+        with _pipeline_runs_lock:
+            _pipeline_runs['active'] -= 1
+        close_feed()
+        search_executor.shutdown(wait=False, cancel_futures=True)
+        facts_executor.shutdown(wait=False, cancel_futures=True)
+        analysis_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,253 @@
+"""
+Run Store - Persistent history of completed research runs, reloadable without repeating search, scrape or analysis
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+import uuid
+from utils.disk_cache import get_cache_dir, hash_key, compress_json, decompress_json
+from utils.search_options import get_research_depth_config, research_depth_level
+
+# Retention: runs older than this many days, or beyond the newest RUN_MAX_RUNS, are deleted on save
+RUN_RETENTION_DAYS = float(os.getenv("RESEARCH_RUN_RETENTION_DAYS", 30))
+RUN_MAX_RUNS = int(os.getenv("RESEARCH_RUN_MAX_RUNS", 200))
+
+# Page text kept per source in a stored run; the scraper keeps up to 100k characters for
+# prompt packing, which would make every stored run (and the session holding it) ~20x larger
+STORED_CONTENT_CHARS = int(os.getenv("RESEARCH_RUN_CONTENT_CHARS", 5000))
+
+def content_hash(text):
+    """
+    SHA-256 of a page's full extracted text, kept with trimmed copies so changes can still be detected
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def depth_satisfies(stored_depth, requested_depth, at_least=False):
+    """
+    Whether a run made at stored_depth answers a request at requested_depth.
+    
+    By default the depth level must match; with at_least a deeper run (more queries and
+    sources) also qualifies. Runs stored without a depth never match.
+    """
+    if not stored_depth:
+        return False
+    if not at_least:
+        return research_depth_level(stored_depth) == research_depth_level(requested_depth)
+    stored = get_research_depth_config(stored_depth)
+    requested = get_research_depth_config(requested_depth)
+    return stored['num_queries'] >= requested['num_queries'] and stored['max_sources'] >= requested['max_sources']
+
+def storable_run(intelligence_data):
+    """
+    Copy of a run with each scraped page's text trimmed to STORED_CONTENT_CHARS.
+    
+    Every trimmed record keeps the hash and length of its full text, so the dashboard can
+    report the real size and an incremental refresh can tell whether a page changed.
+    """
+    scraped_content = []
+    for record in intelligence_data.get('scraped_content', []):
+        content = record.get('content', '')
+        scraped_content.append({
+            **record,
+            'content': content[:STORED_CONTENT_CHARS],
+            'content_hash': record.get('content_hash') or content_hash(content),
+            'content_length': record.get('content_length', len(content))
+        })
+    return {**intelligence_data, 'scraped_content': scraped_content}
+
+def run_key(categories, market, timescale):
+    """
+    Identity of a research request: the same categories, market and time scope share a key in any order
+    """
+    return hash_key(sorted(categories), market, timescale)
+
+class RunStore:
+    """
+    SQLite table of completed research runs.
+    
+    Each run's intelligence data is stored as one compressed JSON blob alongside the
+    columns it is looked up by: request key, market, timescale, depth and creation time,
+    with a separate table indexing runs by category so multi-category runs can be found
+    from any of their categories.
+    """
+    
+    def __init__(self, retention_days=RUN_RETENTION_DAYS, max_runs=RUN_MAX_RUNS):
+        self.retention_days = retention_days
+        self.max_runs = max_runs
+        self.path = os.path.join(get_cache_dir(), "research_runs.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id TEXT PRIMARY KEY,
+                run_key TEXT NOT NULL,
+                categories TEXT NOT NULL,
+                market TEXT NOT NULL,
+                timescale TEXT NOT NULL,
+                research_depth TEXT,
+                sources INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                data BLOB NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS run_categories (
+                run_id TEXT NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+                category TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_key_created ON runs (run_key, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_market_timescale_created ON runs (market, timescale, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_created ON runs (created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_run_categories_category ON run_categories (category, run_id)")
+        self._conn.commit()
+    
+    def save(self, intelligence_data):
+        """
+        Store a completed run and return its id.
+        
+        intelligence_data must carry 'categories', 'market' and 'timescale'; 'research_depth'
+        is recorded when present. Page text is stored trimmed (see storable_run). Expired
+        runs are purged in the same transaction.
+        """
+        intelligence_data = storable_run(intelligence_data)
+        run_id = uuid.uuid4().hex
+        categories = list(intelligence_data['categories'])
+        market = intelligence_data['market']
+        timescale = intelligence_data['timescale']
+        now = time.time()
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runs (id, run_key, categories, market, timescale, research_depth, sources, created_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id, run_key(categories, market, timescale), json.dumps(categories), market, timescale,
+                    intelligence_data.get('research_depth'), len(intelligence_data.get('scraped_content', [])),
+                    now, compress_json(intelligence_data)
+                )
+            )
+            self._conn.executemany(
+                "INSERT INTO run_categories (run_id, category) VALUES (?, ?)",
+                [(run_id, category) for category in categories]
+            )
+            self._purge(now)
+            self._conn.commit()
+        
+        return run_id
+    
+    def _purge(self, now):
+        self._conn.execute("DELETE FROM runs WHERE created_at < ?", (now - self.retention_days * 24 * 3600,))
+        self._conn.execute(
+            "DELETE FROM runs WHERE id IN (SELECT id FROM runs ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_runs,)
+        )
+    
+    def get(self, run_id):
+        """
+        The stored intelligence data for a run, or None if it does not exist or has expired
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return decompress_json(row[0]) if row else None
+    
+    def latest(self, categories, market, timescale, max_age=None, research_depth=None, at_least=False):
+        """
+        Summary of the newest run for exactly these categories, market and timescale, or None.
+        
+        max_age limits how old the run may be in seconds; with research_depth set the run
+        must also satisfy that depth (see depth_satisfies).
+        """
+        return self._newest("run_key = ?", [run_key(categories, market, timescale)], max_age, research_depth, at_least)
+    
+    def latest_covering(self, categories, market, timescale, max_age=None, research_depth=None, at_least=False):
+        """
+        Like latest, but any run whose categories include all of these qualifies, found through run_categories
+        """
+        categories = list(dict.fromkeys(categories))
+        condition = (
+            "market = ? AND timescale = ? AND id IN (SELECT run_id FROM run_categories "
+            f"WHERE category IN ({', '.join('?' for _ in categories)}) "
+            "GROUP BY run_id HAVING COUNT(DISTINCT category) = ?)"
+        )
+        return self._newest(condition, [market, timescale, *categories, len(categories)], max_age, research_depth, at_least)
+    
+    def _newest(self, condition, params, max_age, research_depth, at_least):
+        query = f"SELECT id, categories, market, timescale, research_depth, sources, created_at FROM runs WHERE {condition}"
+        params = list(params)
+        if max_age is not None:
+            query += " AND created_at >= ?"
+            params.append(time.time() - max_age)
+        query += " ORDER BY created_at DESC"
+        
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for row in rows:
+            summary = self._summary(row)
+            if research_depth is None or depth_satisfies(summary['research_depth'], research_depth, at_least):
+                return summary
+        return None
+    
+    def list_runs(self, category=None, market=None, timescale=None, limit=20):
+        """
+        Summaries of the most recent runs, newest first, optionally filtered by category, market and timescale
+        """
+        query = "SELECT id, categories, market, timescale, research_depth, sources, created_at FROM runs"
+        conditions = []
+        params = []
+        if category:
+            conditions.append("id IN (SELECT run_id FROM run_categories WHERE category = ?)")
+            params.append(category)
+        if market:
+            conditions.append("market = ?")
+            params.append(market)
+        if timescale:
+            conditions.append("timescale = ?")
+            params.append(timescale)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._summary(row) for row in rows]
+    
+    def _summary(self, row):
+        run_id, categories, market, timescale, research_depth, sources, created_at = row
+        return {
+            'id': run_id,
+            'categories': json.loads(categories),
+            'market': market,
+            'timescale': timescale,
+            'research_depth': research_depth,
+            'sources': sources,
+            'created_at': created_at
+        }
+    
+    def purge(self):
+        """
+        Delete runs outside the retention window now
+        """
+        with self._lock:
+            self._purge(time.time())
+            self._conn.commit()
+
+_run_store = None
+_run_store_lock = threading.Lock()
+
+def get_run_store():
+    """
+    Return the process-wide research run store
+    """
+    global _run_store
+    with _run_store_lock:
+        if _run_store is None:
+            _run_store = RunStore()
+        return _run_store
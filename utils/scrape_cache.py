@@ -0,0 +1,151 @@
+"""
+Scrape Cache - Persistent page cache keyed by canonical URL, with extracted text stored by HTML hash
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+import zlib
+from utils.disk_cache import get_cache_dir
+
+# Least-recently-used pages beyond this many are evicted together with orphaned extractions
+SCRAPE_CACHE_MAX_PAGES = 5000
+
+def hash_html(html_bytes):
+    """
+    Content address for a downloaded page
+    """
+    return hashlib.sha256(html_bytes).hexdigest()
+
+class ScrapeCache:
+    """
+    SQLite-backed cache of downloaded pages and their extracted text.
+    
+    Raw HTML is stored zlib-compressed per canonical URL together with the ETag and
+    Last-Modified validators needed for conditional revalidation. Extracted text is
+    stored separately under the HTML hash, so an unchanged page never needs to be
+    parsed twice, even when it is reached through a different URL.
+    """
+    
+    def __init__(self, max_pages=SCRAPE_CACHE_MAX_PAGES):
+        self.max_pages = max_pages
+        self.path = os.path.join(get_cache_dir(), "scrape_pages.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                html BLOB NOT NULL,
+                html_hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS extractions (
+                html_hash TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                extracted_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_last_access ON pages (last_access)")
+        self._conn.commit()
+    
+    def get_page(self, url):
+        """
+        Return the cached page for a canonical URL, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT html, html_hash, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        return {
+            'html': zlib.decompress(row[0]),
+            'html_hash': row[1],
+            'etag': row[2],
+            'last_modified': row[3],
+            'fetched_at': row[4]
+        }
+    
+    def put_page(self, url, html_bytes, etag=None, last_modified=None):
+        """
+        Store a freshly downloaded page and return its HTML hash
+        """
+        now = time.time()
+        html_hash = hash_html(html_bytes)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, html, html_hash, etag, last_modified, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, zlib.compress(html_bytes), html_hash, etag, last_modified, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+        return html_hash
+    
+    def touch_page(self, url, etag=None, last_modified=None):
+        """
+        Record a successful revalidation (HTTP 304) of a cached page
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, last_access = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (now, now, etag, last_modified, url)
+            )
+            self._conn.commit()
+    
+    def get_extraction(self, html_hash):
+        """
+        Return previously extracted text for an HTML hash, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM extractions WHERE html_hash = ?", (html_hash,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def put_extraction(self, html_hash, text):
+        """
+        Store extracted text under the hash of the HTML it came from
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (html_hash, text, extracted_at) VALUES (?, ?, ?)",
+                (html_hash, text, time.time())
+            )
+            self._conn.commit()
+    
+    def _evict(self):
+        evicted = self._conn.execute(
+            "DELETE FROM pages WHERE url IN ("
+            "SELECT url FROM pages ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_pages,)
+        ).rowcount
+        if evicted:
+            self._conn.execute(
+                "DELETE FROM extractions WHERE html_hash NOT IN (SELECT html_hash FROM pages)"
+            )
+
+_scrape_cache = None
+_scrape_cache_lock = threading.Lock()
+
+def get_scrape_cache():
+    """
+    Return the process-wide scrape cache
+    """
+    global _scrape_cache
+    with _scrape_cache_lock:
+        if _scrape_cache is None:
+            _scrape_cache = ScrapeCache()
+        return _scrape_cache
@@ -1,57 +1,357 @@
+import asyncio
+import multiprocessing
+import queue
+import threading
 import trafilatura
-import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import time
+import httpx
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.rate_limit import get_host_rate_limiter, interleave_by_host
+from utils.scrape_cache import get_scrape_cache
+from utils.url_utils import canonicalize_url
 
-def scrape_single_url(url):
+USER_AGENT = "Mozilla/5.0 (compatible; SmartAcquisition/1.0; +market-intelligence)"
+CONNECT_TIMEOUT = 10  # seconds to establish a connection
+READ_TIMEOUT = 30  # seconds to wait between bytes of a response
+MAX_PAGE_BYTES = 5 * 1024 * 1024  # pages larger than this are abandoned mid-download
+MAX_CONTENT_CHARS = 100000  # extracted text kept per page; prompts select passages by token budget
+EXTRACT_WORKERS = 2  # trafilatura worker processes
+EXTRACT_QUEUE_SIZE = 16  # downloaded pages allowed to wait for extraction
+URL_FEED_POLL_SECONDS = 0.05  # how often a streamed URL queue is checked for new work
+
+# Error messages that mark a URL as timed out rather than failed to extract
+FETCH_TIMEOUT_ERROR = "Timed out fetching page"
+SCRAPE_TIMEOUT_ERROR = "Timed out: scrape time budget exceeded"
+
+def is_timeout_error(record):
     """
-    Scrape a single URL and return the text content
+    Whether a failed scrape record timed out, as opposed to failing to download or extract
     """
-    try:
-        # Add a small delay to be respectful to servers
-        time.sleep(0.5)
-        
-        # Fetch the URL
-        downloaded = trafilatura.fetch_url(url)
-        if downloaded:
-            # Extract text content
-            text = trafilatura.extract(downloaded)
-            if text:
-                return {
-                    'url': url,
-                    'content': text[:5000],  # Limit content length
-                    'success': True
-                }
-        
+    return record.get('error') in (FETCH_TIMEOUT_ERROR, SCRAPE_TIMEOUT_ERROR)
+
+def conditional_headers(cached_page):
+    """
+    Request headers for a fetch, adding ETag/Last-Modified validators when a cached copy exists
+    """
+    headers = {'User-Agent': USER_AGENT}
+    if cached_page:
+        if cached_page['etag']:
+            headers['If-None-Match'] = cached_page['etag']
+        if cached_page['last_modified']:
+            headers['If-Modified-Since'] = cached_page['last_modified']
+    return headers
+
+def store_response(canonical_url, cached_page, status_code, content, response_headers):
+    """
+    Reconcile a fetch with the page cache.
+    
+    Returns (html_bytes, html_hash, cache_status) where cache_status is one of
+    'miss' (not cached before), 'not_modified' (server answered 304),
+    'unchanged' (re-downloaded but identical) or 'changed'.
+    Returns (None, None, None) when the response carried no usable page.
+    """
+    cache = get_scrape_cache()
+    etag = response_headers.get('ETag')
+    last_modified = response_headers.get('Last-Modified')
+    
+    if status_code == 304 and cached_page:
+        cache.touch_page(canonical_url, etag, last_modified)
+        return cached_page['html'], cached_page['html_hash'], 'not_modified'
+    
+    if not 200 <= status_code < 300 or not content:
+        return None, None, None
+    
+    html_hash = cache.put_page(canonical_url, content, etag, last_modified)
+    if not cached_page:
+        cache_status = 'miss'
+    elif cached_page['html_hash'] == html_hash:
+        cache_status = 'unchanged'
+    else:
+        cache_status = 'changed'
+    
+    return content, html_hash, cache_status
+
+def failure_result(url, error):
+    """
+    Result record for a URL that could not be scraped
+    """
+    return {
+        'url': url,
+        'content': '',
+        'success': False,
+        'error': error
+    }
+
+def build_result(url, text, cache_status):
+    """
+    Result record for a scraped URL
+    """
+    if text:
         return {
             'url': url,
-            'content': '',
-            'success': False,
-            'error': 'Failed to extract content'
+            'content': text[:MAX_CONTENT_CHARS],
+            'success': True,
+            'cache_status': cache_status
         }
+    
+    return failure_result(url, 'Failed to extract content')
+
+async def fetch_async(client, url):
+    """
+    Stream a page through the pooled async client, revalidating any cached copy.
+    
+    The body is read incrementally and abandoned once it exceeds MAX_PAGE_BYTES.
+    """
+    canonical_url = canonicalize_url(url)
+    cached_page = get_scrape_cache().get_page(canonical_url)
+    
+    async with client.stream("GET", url, headers=conditional_headers(cached_page)) as response:
+        declared_length = response.headers.get('Content-Length')
+        if declared_length and declared_length.isdigit() and int(declared_length) > MAX_PAGE_BYTES:
+            raise ValueError(f"Page exceeds {MAX_PAGE_BYTES // (1024 * 1024)}MB size cap")
         
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > MAX_PAGE_BYTES:
+                raise ValueError(f"Page exceeds {MAX_PAGE_BYTES // (1024 * 1024)}MB size cap")
+            chunks.append(chunk)
+    
+    return store_response(canonical_url, cached_page, response.status_code, b"".join(chunks), response.headers)
+
+def extract_text(html):
+    """
+    Run trafilatura on downloaded HTML; executed in the extraction process pool
+    """
+    return trafilatura.extract(html)
+
+_extraction_pools = {}
+_extraction_pools_lock = threading.Lock()
+
+def get_extraction_pool(workers):
+    """
+    Return the process-wide extraction pool with the given number of worker processes.
+    
+    Workers are started with the spawn method because forking the multi-threaded
+    Streamlit server can deadlock on locks held by other threads.
+    """
+    with _extraction_pools_lock:
+        pool = _extraction_pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _extraction_pools[workers] = pool
+        return pool
+
+def discard_extraction_pool(workers):
+    """
+    Drop a broken extraction pool so the next scrape starts a fresh one
+    """
+    with _extraction_pools_lock:
+        pool = _extraction_pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+async def download_url_async(client, url, semaphore, rate_limiter):
+    """
+    Download stage: fetch one URL on the event loop.
+    
+    Returns a pending page {'url', 'html', 'html_hash', 'cache_status'} or a failure record.
+    """
+    try:
+        # Wait for the host's rate limit before taking a connection slot
+        delay = rate_limiter.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        async with semaphore:
+            downloaded, html_hash, cache_status = await fetch_async(client, url)
+        
+        if not downloaded:
+            return failure_result(url, 'Failed to extract content')
+        
+        return {'url': url, 'html': downloaded, 'html_hash': html_hash, 'cache_status': cache_status}
+    
+    except httpx.TimeoutException:
+        return failure_result(url, FETCH_TIMEOUT_ERROR)
     except Exception as e:
-        return {
-            'url': url,
-            'content': '',
-            'success': False,
-            'error': str(e)
-        }
+        return failure_result(url, str(e))
+
+async def extract_pages_async(extract_queue, extraction_pool, extract_workers, emit):
+    """
+    Extraction stage: parse queued pages in the process pool and emit result records
+    """
+    loop = asyncio.get_running_loop()
+    cache = get_scrape_cache()
+    
+    while True:
+        page = await extract_queue.get()
+        if page is None:
+            return
+        
+        # Every page must end in a record: an extractor that raised would stop draining the queue
+        try:
+            try:
+                text = await loop.run_in_executor(extraction_pool, extract_text, page['html'])
+            except BrokenProcessPool:
+                discard_extraction_pool(extract_workers)
+                text = await loop.run_in_executor(None, extract_text, page['html'])
+            
+            if text:
+                try:
+                    cache.put_extraction(page['html_hash'], text)
+                except Exception as e:
+                    # A failed cache write (e.g. "database is locked") only costs a re-extraction next time
+                    print(f"Extraction cache write failed for {page['url']}: {e}")
+            record = build_result(page['url'], text, page['cache_status'])
+        except Exception as e:
+            record = failure_result(page['url'], f"Extraction failed: {e}")
+        
+        emit(record)
 
-def scrape_urls(urls, max_workers=5):
+async def scrape_urls_async(urls, max_workers=5, rate_limiter=None, extract_workers=EXTRACT_WORKERS, extract_queue_size=EXTRACT_QUEUE_SIZE, emit=None, time_budget=None):
     """
-    Scrape multiple URLs concurrently
+    Scrape URLs as a two-stage pipeline.
+    
+    Downloads run on one event loop with a shared keep-alive connection pool and at
+    most max_workers requests in flight. Downloaded pages go through a bounded queue
+    to extract_workers processes running trafilatura, so CPU-bound parsing neither
+    holds the GIL against network I/O nor lets downloads run unboundedly ahead of it.
+    Pages whose HTML was extracted before skip the extraction stage entirely.
+    
+    urls may also be a queue.Queue fed from another thread and closed with None, in which
+    case each URL starts downloading as soon as it is queued (the per-host rate limiter
+    still spaces requests, but there is no up-front host interleaving).
+    
+    Every record, successful or not, is passed to emit as soon as it is ready; without
+    an emit callback the records are collected and returned as a list. Once time_budget
+    seconds have passed, outstanding work is cancelled and each unfinished URL is
+    reported with error SCRAPE_TIMEOUT_ERROR.
     """
+    rate_limiter = rate_limiter or get_host_rate_limiter()
+    semaphore = asyncio.Semaphore(max_workers)
+    limits = httpx.Limits(max_connections=max_workers, max_keepalive_connections=max_workers)
+    timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+    extract_queue = asyncio.Queue(maxsize=extract_queue_size)
+    extraction_pool = get_extraction_pool(extract_workers)
+    cache = get_scrape_cache()
     results = []
+    emit_record = emit or results.append
+    finished_urls = set()
+    requested_urls = [] if isinstance(urls, queue.Queue) else list(urls)
+    
+    def emit(record):
+        finished_urls.add(record['url'])
+        emit_record(record)
+    
+    async def download(client, url):
+        page = await download_url_async(client, url, semaphore, rate_limiter)
+        if 'html' not in page:
+            emit(page)
+            return
+        
+        text = cache.get_extraction(page['html_hash'])
+        if text is not None:
+            emit(build_result(url, text, page['cache_status']))
+        else:
+            await extract_queue.put(page)
+    
+    extractors = [
+        asyncio.create_task(extract_pages_async(extract_queue, extraction_pool, extract_workers, emit))
+        for _ in range(extract_workers)
+    ]
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all scraping tasks
-        future_to_url = {executor.submit(scrape_single_url, url): url for url in urls}
+    async def download_feed(client):
+        downloads = []
+        while True:
+            try:
+                url = urls.get_nowait()
+            except queue.Empty:
+                # Poll rather than block a thread, so a budget timeout can cancel the wait
+                await asyncio.sleep(URL_FEED_POLL_SECONDS)
+                continue
+            if url is None:
+                break
+            requested_urls.append(url)
+            downloads.append(asyncio.create_task(download(client, url)))
+        await asyncio.gather(*downloads)
+    
+    async def run_stages():
+        async with httpx.AsyncClient(limits=limits, timeout=timeout, follow_redirects=True) as client:
+            if isinstance(urls, queue.Queue):
+                await download_feed(client)
+            else:
+                await asyncio.gather(*[download(client, url) for url in interleave_by_host(urls)])
         
-        # Process completed tasks
-        for future in as_completed(future_to_url):
-            result = future.result()
-            if result['success'] and result['content']:
-                results.append(result)
+        for _ in extractors:
+            await extract_queue.put(None)
+        await asyncio.gather(*extractors)
+    
+    try:
+        await asyncio.wait_for(run_stages(), timeout=time_budget)
+    except asyncio.TimeoutError:
+        # Budget exhausted: drop stragglers and carry on with whatever content arrived
+        for extractor in extractors:
+            extractor.cancel()
+        await asyncio.gather(*extractors, return_exceptions=True)
+        
+        for url in dict.fromkeys(requested_urls):
+            if url not in finished_urls:
+                emit(failure_result(url, SCRAPE_TIMEOUT_ERROR))
     
     return results
+
+def iter_scrape_urls(urls, max_workers=5, rate_limiter=None, extract_workers=EXTRACT_WORKERS, extract_queue_size=EXTRACT_QUEUE_SIZE, time_budget=None):
+    """
+    Scrape URLs concurrently and yield each {'url', 'content', 'success'} record as soon as it is ready.
+    
+    Failed URLs are yielded too, with success False and an 'error' message. urls may be a
+    queue.Queue closed with None (see scrape_urls_async). The event loop runs on a
+    background thread so the caller (e.g. the Streamlit script thread) can update the
+    UI between records.
+    """
+    if not urls:
+        return
+    
+    records = queue.Queue()
+    done = object()
+    
+    def run():
+        try:
+            asyncio.run(scrape_urls_async(
+                urls,
+                max_workers=max_workers,
+                rate_limiter=rate_limiter,
+                extract_workers=extract_workers,
+                extract_queue_size=extract_queue_size,
+                emit=records.put,
+                time_budget=time_budget
+            ))
+        except Exception as e:
+            records.put(e)
+        finally:
+            records.put(done)
+    
+    threading.Thread(target=run, name="scrape-event-loop", daemon=True).start()
+    
+    while True:
+        record = records.get()
+        if record is done:
+            return
+        if isinstance(record, Exception):
+            raise record
+        yield record
+
+def scrape_urls(urls, max_workers=5, rate_limiter=None, extract_workers=EXTRACT_WORKERS, extract_queue_size=EXTRACT_QUEUE_SIZE, time_budget=None):
+    """
+    Scrape multiple URLs concurrently, throttled per host, and return the successful results
+    """
+    records = iter_scrape_urls(
+        urls,
+        max_workers=max_workers,
+        rate_limiter=rate_limiter,
+        extract_workers=extract_workers,
+        extract_queue_size=extract_queue_size,
+        time_budget=time_budget
+    )
+    return [record for record in records if record['success'] and record['content']]
@@ -1,10 +1,126 @@
 import os
+import re
+import queue
+import threading
+import httplib2
+from contextlib import contextmanager
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from utils.disk_cache import DiskCache, hash_key
 
-def search_google(query, num_results=10, time_filter=None, enhanced_filtering=True):
+# Upper bound on idle Custom Search clients kept per API key; matches the Deep search concurrency
+SEARCH_CLIENT_POOL_SIZE = 8
+
+class SearchClientPool:
+    """
+    Thread-safe pool of Custom Search service objects.
+    
+    Each service owns its own httplib2 transport (which is not safe to share between
+    threads), so a checked-out client keeps its keep-alive connection to the API for
+    the next query instead of re-parsing the discovery document and reconnecting.
+    """
+    
+    def __init__(self, api_key, timeout=None, max_size=SEARCH_CLIENT_POOL_SIZE):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_size = max_size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+    
+    def _create_service(self):
+        http = httplib2.Http(timeout=self.timeout)
+        return build("customsearch", "v1", developerKey=self.api_key, http=http, cache_discovery=False)
+    
+    @contextmanager
+    def checkout(self):
+        """
+        Borrow a service for one request, creating one if the pool is not yet full
+        """
+        try:
+            service = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.max_size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    service = self._create_service()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                service = self._idle.get()
+        
+        try:
+            yield service
+        finally:
+            self._idle.put(service)
+
+# Least-recently-used search responses beyond this many are evicted from the on-disk cache
+SEARCH_CACHE_MAX_ENTRIES = 5000
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+def get_search_cache():
+    """
+    Return the process-wide on-disk search result cache
+    """
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = DiskCache("search_results", max_entries=SEARCH_CACHE_MAX_ENTRIES)
+        return _search_cache
+
+def get_search_cache_stats():
+    """
+    Hit/miss counters for the search result cache in this process
+    """
+    return get_search_cache().stats()
+
+def search_cache_key(query, date_restrict, num_results):
+    """
+    Cache key for a search: the normalized query text, dateRestrict window and result count.
+    
+    The rolling after:YYYY-MM-DD modifier is dropped from the text because the
+    dateRestrict window already captures it and the date changes every day.
+    """
+    normalized_query = " ".join(re.sub(r'after:\S+', ' ', query).lower().split())
+    return hash_key(normalized_query, date_restrict, num_results)
+
+def search_cache_ttl(date_restrict):
+    """
+    Freshness window that scales with the search timescale: one day per six months searched
+    """
+    try:
+        window_days = int(date_restrict[1:]) if date_restrict else 180
+    except ValueError:
+        window_days = 180
+    return max(3600, window_days * 86400 / 180)
+
+_client_pools = {}
+_client_pools_lock = threading.Lock()
+
+def get_search_client_pool(api_key, timeout=None):
+    """
+    Return the process-wide client pool for an API key and timeout
+    """
+    key = (api_key, timeout)
+    with _client_pools_lock:
+        pool = _client_pools.get(key)
+        if pool is None:
+            pool = SearchClientPool(api_key, timeout=timeout)
+            _client_pools[key] = pool
+        return pool
+
+def search_google(query, num_results=10, time_filter=None, enhanced_filtering=True, timeout=None, use_cache=True):
     """
-    Search Google using the Custom Search API with enhanced filtering
+    Search Google using the Custom Search API with enhanced filtering.
+    
+    Successful responses are cached on disk; set use_cache=False or SEARCH_CACHE_DISABLED=1 to bypass.
     """
     api_key = os.getenv("GOOGLE_API_KEY")
     search_engine_id = os.getenv("SEARCH_CX")
@@ -13,7 +129,9 @@ def search_google(query, num_results=10, time_filter=None, enhanced_filtering=Tr
         raise ValueError("Google API key or Search Engine ID not configured")
     
     try:
-        service = build("customsearch", "v1", developerKey=api_key)
+        # Clients are pooled per process; the timeout is applied at the socket level
+        # so a stalled request cannot hold up a batch
+        pool = get_search_client_pool(api_key, timeout)
         
         # Enhanced query with time filter and relevance boosting
         enhanced_query = query
@@ -40,7 +158,16 @@ def search_google(query, num_results=10, time_filter=None, enhanced_filtering=Tr
             except:
                 pass  # Fall back to query-based filtering
         
-        result = service.cse().list(**search_params).execute()
+        use_cache = use_cache and os.getenv("SEARCH_CACHE_DISABLED") != "1"
+        date_restrict = search_params.get('dateRestrict')
+        cache_key = search_cache_key(enhanced_query, date_restrict, num_results)
+        if use_cache:
+            cached_results = get_search_cache().get(cache_key)
+            if cached_results is not None:
+                return cached_results
+        
+        with pool.checkout() as service:
+            result = service.cse().list(**search_params).execute()
         
         search_results = []
         
@@ -53,6 +180,9 @@ def search_google(query, num_results=10, time_filter=None, enhanced_filtering=Tr
                     'displayLink': item.get('displayLink', '')
                 })
         
+        if use_cache:
+            get_search_cache().set(cache_key, search_results, search_cache_ttl(date_restrict))
+        
         return search_results
         
     except HttpError as e:
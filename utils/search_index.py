@@ -0,0 +1,68 @@
+"""
+Search Result Index - Deduplicate search results by canonical URL while keeping query provenance
+"""
+
+import threading
+from utils.url_utils import canonicalize_url
+
+class SearchResultIndex:
+    """
+    Index of search results keyed by canonical URL, built as each query's results arrive.
+    
+    Many templated queries return the same pages, and tracking-parameter variants of a
+    link canonicalize to one key, so each page is listed (and later fetched) once. Every
+    unique result remembers which queries found it.
+    """
+    
+    def __init__(self, queries):
+        self.queries = list(queries)
+        self._results_by_query = {}
+        self._query_indexes_by_url = {}
+        self._lock = threading.Lock()
+    
+    def add(self, query_index, results):
+        """
+        Record one query's results; returns how many of them were new URLs
+        """
+        new_urls = 0
+        with self._lock:
+            self._results_by_query[query_index] = results
+            for result in results:
+                canonical_url = canonicalize_url(result.get('link', ''))
+                query_indexes = self._query_indexes_by_url.setdefault(canonical_url, set())
+                if not query_indexes:
+                    new_urls += 1
+                query_indexes.add(query_index)
+        return new_urls
+    
+    def unique_results(self):
+        """
+        One result per canonical URL, in query order then rank order.
+        
+        Ordering does not depend on which searches finished first. Each result gains
+        'canonical_url' and 'queries' (the text of every query that returned it).
+        """
+        unique = []
+        seen = set()
+        with self._lock:
+            for query_index in sorted(self._results_by_query):
+                for result in self._results_by_query[query_index]:
+                    canonical_url = canonicalize_url(result.get('link', ''))
+                    if canonical_url in seen:
+                        continue
+                    seen.add(canonical_url)
+                    unique.append(dict(
+                        result,
+                        canonical_url=canonical_url,
+                        queries=[self.queries[i] for i in sorted(self._query_indexes_by_url[canonical_url])]
+                    ))
+        return unique
+    
+    def stats(self):
+        """
+        Total results returned across queries, unique URLs, and duplicates removed
+        """
+        with self._lock:
+            total = sum(len(results) for results in self._results_by_query.values())
+            unique = len(self._query_indexes_by_url)
+        return {'total_results': total, 'unique_urls': unique, 'duplicates': total - unique}
@@ -2,16 +2,15 @@
 Search Options Generation - Convert user natural language input to selectable research options
 """
 
-import os
 import json
-from openai import OpenAI
+from utils.llm_client import create_chat_completion, get_openai_client
 
 def generate_search_options(user_input, market="UK"):
     """
     Generate intelligent search options from user's natural language input
     """
     try:
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = get_openai_client()
         
         prompt = f"""
         Convert this user research request into 3-5 specific, actionable procurement intelligence topics:
@@ -38,7 +37,8 @@ def generate_search_options(user_input, market="UK"):
         - "Infrastructure concrete demand pipeline and market forecasts"
         """
         
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            client,
             model="gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
             messages=[
                 {"role": "system", "content": "You are a procurement intelligence specialist. Generate specific, actionable research topics from user input."},
@@ -58,32 +58,58 @@ def generate_search_options(user_input, market="UK"):
             f"{user_input} - pricing and risk evaluation"
         ]
 
-def format_time_filter(timescale):
+def timescale_days(timescale):
     """
-    Convert timescale selection to enhanced search query modifier
+    Days of content a timescale selection covers
     """
-    from datetime import datetime, timedelta
-    
-    current_date = datetime.now()
-    
     if "6 months" in timescale:
-        six_months_ago = current_date - timedelta(days=180)
-        return f"after:{six_months_ago.strftime('%Y-%m-%d')}"
+        return 180
     elif "12 months" in timescale:
-        twelve_months_ago = current_date - timedelta(days=365)
-        return f"after:{twelve_months_ago.strftime('%Y-%m-%d')}"
+        return 365
     else:
         # For older content, still apply some recency bias
-        two_years_ago = current_date - timedelta(days=730)
-        return f"after:{two_years_ago.strftime('%Y-%m-%d')}"
+        return 730
+
+def format_time_filter(timescale):
+    """
+    Convert timescale selection to enhanced search query modifier
+    """
+    from datetime import datetime, timedelta
+    
+    window_start = datetime.now() - timedelta(days=timescale_days(timescale))
+    return f"after:{window_start.strftime('%Y-%m-%d')}"
 
 def get_research_depth_config(depth):
     """
     Get configuration based on research depth setting
     """
     configs = {
-        "Quick": {"num_queries": 5, "num_results": 5, "max_workers": 3},
-        "Medium": {"num_queries": 10, "num_results": 8, "max_workers": 5},
-        "Deep": {"num_queries": 20, "num_results": 10, "max_workers": 8}
+        "Quick": {
+            "num_queries": 5, "num_results": 5, "max_workers": 3,
+            "search_concurrency": 3, "search_timeout": 15,
+            "extract_workers": 1, "extract_queue_size": 8, "scrape_budget": 45,
+            "analysis_concurrency": 2,
+            "max_sources": 10, "map_reduce_threshold": None, "map_concurrency": 3
+        },
+        "Medium": {
+            "num_queries": 10, "num_results": 8, "max_workers": 5,
+            "search_concurrency": 5, "search_timeout": 15,
+            "extract_workers": 2, "extract_queue_size": 16, "scrape_budget": 75,
+            "analysis_concurrency": 3,
+            "max_sources": 16, "map_reduce_threshold": 12, "map_concurrency": 4
+        },
+        "Deep": {
+            "num_queries": 20, "num_results": 10, "max_workers": 8,
+            "search_concurrency": 8, "search_timeout": 20,
+            "extract_workers": 4, "extract_queue_size": 32, "scrape_budget": 120,
+            "analysis_concurrency": 5,
+            "max_sources": 40, "map_reduce_threshold": 12, "map_concurrency": 8
+        }
     }
-    return configs.get(depth, configs["Medium"])
\ No newline at end of file
+    return configs.get(research_depth_level(depth), configs["Medium"])
+
+def research_depth_level(depth):
+    """
+    Level name of a research depth; the UI passes labels such as "Deep (20 queries)", so match on the leading word
+    """
+    return depth.split()[0] if depth else "Medium"
\ No newline at end of file
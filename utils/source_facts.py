@@ -0,0 +1,179 @@
+"""
+Source Facts - Category-agnostic fact sheets extracted once per scraped document
+"""
+
+import json
+import re
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.llm_client import create_chat_completion, get_openai_client
+from utils.context_packer import pack_sources, format_packed_sources, query_terms
+from utils.disk_cache import DiskCache, hash_key
+
+FACTS_SOURCE_TOKENS = 6000  # a document's fact sheet is extracted from at most this many tokens of its text
+FACTS_PROMPT_VERSION = 2  # bump when the extraction prompt changes so cached fact sheets are not reused
+SOURCE_FACTS_TTL = 30 * 86400  # fact sheets are keyed by content hash, so they only age out
+SOURCE_FACTS_MAX_ENTRIES = 5000
+
+# Categories with fewer matching facts than this see every fact, ranked by relevance instead
+MIN_CATEGORY_FACTS = 20
+
+# Leading characters of a category term used to match facts, so "pipes" also matches "pipework"
+TERM_STEM_LENGTH = 5
+
+_source_facts_cache = None
+_source_facts_cache_lock = threading.Lock()
+
+def get_source_facts_cache():
+    """
+    Return the process-wide on-disk cache of per-document fact sheets
+    """
+    global _source_facts_cache
+    with _source_facts_cache_lock:
+        if _source_facts_cache is None:
+            _source_facts_cache = DiskCache("source_facts", max_entries=SOURCE_FACTS_MAX_ENTRIES)
+        return _source_facts_cache
+
+def document_facts(client, source):
+    """
+    Metrics, dates, entities and key points from one document, cached per content hash.
+    
+    Returns (facts, whether they came from the cache).
+    """
+    content_hash = hashlib.sha256(source['content'].encode('utf-8')).hexdigest()
+    cache_key = hash_key(FACTS_PROMPT_VERSION, content_hash)
+    cache = get_source_facts_cache()
+    facts = cache.get(cache_key)
+    if facts is not None:
+        return facts, True
+    
+    packed, _ = pack_sources([source], FACTS_SOURCE_TOKENS)
+    if not packed:
+        return {}, False
+    
+    extraction_prompt = f"""
+    Extract every fact in this source that could matter for procurement and market intelligence.
+    
+    {format_packed_sources(packed)}
+    
+    Provide the facts in JSON format:
+    {{
+        "metrics": [
+            {{"metric": "Metric name", "value": "Value exactly as stated", "context": "Time period or scope", "topics": ["keyword"]}}
+        ],
+        "dates": [
+            {{"date": "Date as stated", "event": "What happens or happened", "topics": ["keyword"]}}
+        ],
+        "entities": [
+            {{"name": "Company, regulator, project or product", "type": "company/regulator/project/product", "detail": "Role or development", "topics": ["keyword"]}}
+        ],
+        "key_points": [
+            {{"point": "Short factual statement", "topics": ["keyword"]}}
+        ]
+    }}
+    
+    "topics" are 1-4 lowercase keywords naming the sectors, materials, services or themes a fact concerns (for example "steel", "water utilities", "pricing").
+    Include only facts stated in the source, with numbers exactly as written. Use empty lists when nothing applies. No HTML tags.
+    """
+    
+    response = create_chat_completion(
+        client,
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": "You extract compact, verifiable facts from market sources. Never include HTML tags in your responses."},
+            {"role": "user", "content": extraction_prompt}
+        ],
+        response_format={"type": "json_object"},
+        use_cache=False  # the fact sheet itself is cached per content hash below
+    )
+    
+    # Imported here: category_specific_analysis imports this module at load time
+    from utils.category_specific_analysis import clean_html_tags
+    facts = clean_html_tags(json.loads(response.choices[0].message.content))
+    cache.set(cache_key, facts, SOURCE_FACTS_TTL)
+    return facts, False
+
+def extract_source_facts(sources, concurrency=4, client=None):
+    """
+    Fact sheets for every document, extracted in parallel and reused across categories.
+    
+    Returns (fact sheets, stats). Each fact sheet has 'url', 'duplicate_urls' and 'facts';
+    documents whose extraction fails are left out and counted in the stats.
+    """
+    client = client or get_openai_client()
+    sources = [source for source in sources if source.get('content')]
+    stats = {'documents': len(sources), 'cached': 0, 'extracted': 0, 'failed': 0}
+    if not sources:
+        return [], stats
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(sources)))) as executor:
+        futures = [executor.submit(document_facts, client, source) for source in sources]
+        
+        fact_sheets = []
+        for source, future in zip(sources, futures):
+            try:
+                facts, cached = future.result()
+            except Exception as e:
+                print(f"Fact extraction failed for {source['url']}: {e}")
+                stats['failed'] += 1
+                continue
+            
+            stats['cached' if cached else 'extracted'] += 1
+            if facts:
+                fact_sheets.append({
+                    'url': source['url'],
+                    'duplicate_urls': source.get('duplicate_urls', []),
+                    'facts': facts
+                })
+    
+    return fact_sheets, stats
+
+def fact_lines(facts):
+    """
+    One line per fact, with its topics, so facts can be filtered and packed individually
+    """
+    lines = []
+    for metric in facts.get('metrics', []):
+        line = f"- Metric: {metric.get('metric', '')}: {metric.get('value', '')}"
+        if metric.get('context'):
+            line += f" ({metric['context']})"
+        lines.append((line, metric.get('topics', [])))
+    for date in facts.get('dates', []):
+        lines.append((f"- Date: {date.get('date', '')}: {date.get('event', '')}", date.get('topics', [])))
+    for entity in facts.get('entities', []):
+        lines.append((f"- Entity: {entity.get('name', '')} ({entity.get('type', '')}): {entity.get('detail', '')}", entity.get('topics', [])))
+    for point in facts.get('key_points', []):
+        if isinstance(point, str):
+            lines.append((f"- {point}", []))
+        else:
+            lines.append((f"- {point.get('point', '')}", point.get('topics', [])))
+    
+    return [
+        f"{line} [{', '.join(topics)}]" if topics else line
+        for line, topics in lines
+    ]
+
+def facts_for_category(fact_sheets, category):
+    """
+    Render the fact sheets as source records holding only the facts relevant to a category.
+    
+    A fact is kept when its text or topics share a stem with the category name. If that
+    leaves too few facts, every fact is kept and the context packer ranks them instead.
+    """
+    stems = {term[:TERM_STEM_LENGTH] for term in query_terms(category)}
+    
+    def relevant(line):
+        words = re.findall(r'[a-z0-9]+', line.lower())
+        return any(word.startswith(stem) for word in words for stem in stems)
+    
+    all_lines = [(sheet, fact_lines(sheet['facts'])) for sheet in fact_sheets]
+    matching = [(sheet, [line for line in lines if relevant(line)]) for sheet, lines in all_lines]
+    if stems and sum(len(lines) for _, lines in matching) >= MIN_CATEGORY_FACTS:
+        all_lines = matching
+    
+    return [
+        {'url': sheet['url'], 'duplicate_urls': sheet['duplicate_urls'], 'content': "\n".join(lines)}
+        for sheet, lines in all_lines
+        if lines
+    ]
@@ -0,0 +1,49 @@
+"""
+URL Utilities - Canonical forms for URLs used as cache and deduplication keys
+"""
+
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Query parameters that only track how a visitor arrived and never change the page served
+TRACKING_PARAMS = {
+    'gclid', 'gclsrc', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'ref', 'ref_src', 'spm', 'cmpid', 'ito', 'ncid'
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'mtm_')
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def canonicalize_url(url):
+    """
+    Normalize a URL so trivially different spellings of the same page compare equal.
+    
+    Lower-cases the scheme and host, drops default ports, fragments and tracking
+    parameters (utm_*, gclid, fbclid, ...), and sorts the remaining query parameters.
+    Unparseable input is returned stripped but otherwise unchanged.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+        port = parts.port
+    except ValueError:
+        return url.strip()
+    
+    if not scheme or not host:
+        return url.strip()
+    
+    netloc = host
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{host}:{port}"
+    
+    path = parts.path or '/'
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(name)
+    ))
+    
+    return urlunsplit((scheme, netloc, path, query, ''))